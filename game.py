@@ -1,7 +1,34 @@
-from Pygen import UI, Events, TileMap, Sprites, Animator, Sounds
-import pygame, time, math, random, json
+import time, math, random, json, sys, os, argparse, atexit, collections, itertools, heapq
 from enum import Enum
 
+# command line options (mainly for running a headless benchmark so performance can be compared from one run to the next)
+#   python game.py --headless --frames 1200 --seed 1
+argumentParser = argparse.ArgumentParser(description="2D atmospheric shooter")
+argumentParser.add_argument("--headless", action="store_true", help="run a deterministic simulation without a window and print the per-phase timings")
+argumentParser.add_argument("--frames", type=int, default=1200, help="the number of frames to simulate when headless")
+argumentParser.add_argument("--seed", type=int, default=0, help="the seed for the random module when headless")
+argumentParser.add_argument("--dt", type=float, default=1/120, help="the fixed timestep used when headless")
+argumentParser.add_argument("--script", type=str, default="", help="a json file of scripted input to play back when headless")
+argumentParser.add_argument("--profile", action="store_true", help="time the phases of every frame and show them in an overlay (F3 toggles it)")
+argumentParser.add_argument("--profile-out", type=str, default="", help="a .csv or .json file the profiler's stats are written to on exit")
+argumentParser.add_argument("--light-backend", choices=["blit", "numpy"], default="blit", help="how the light map is built (blending surfaces or adding into a numpy buffer)")
+argumentParser.add_argument("--light-downscale", type=int, default=1, help="how many times smaller the numpy light buffer is than the screen (2 is half resolution)")
+# only the command line of the game itself is parsed (importing the game, like the tests do, runs it headless with the default options)
+arguments = argumentParser.parse_args(None if __name__ == "__main__" else ["--headless"])
+
+HEADLESS = arguments.headless
+if HEADLESS:
+    # the dummy drivers have to be selected before pygame gets initialized
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+from Pygen import UI, Events, TileMap, Sprites, Animator, Sounds
+import pygame
+try:
+    import numpy
+except ImportError:  # the batched systems fall back to the regular objects without numpy
+    numpy = None
+
 # initializing sound and pygame
 Sounds.preInit(maxChannels=8)
 pygame.init()
@@ -21,7 +48,6 @@ Don't use - It seems using rects in update won't provide a lot of help consideri
 
 TODO
     - BUGS -
-Stop the player from being able to shoot through thin walls
 
 
     - PERFORMANCE -
@@ -142,11 +168,335 @@ class HitBox:
         )
 
 
+# a uniform grid that stores objects by the cells their boxes cover (so only nearby objects have to be checked)
+class SpatialGrid:
+    def __init__(self, cellSize: int) -> None:
+        self.cellSize = cellSize
+        self.cells = {}  # (x, y) -> {object: None} (a dict instead of a set so the order is deterministic)
+        self.objectCells = {}  # object -> the range of cells it's in (left, top, right, bottom)
+    
+    # gets the range of cells a box [x, y, width, height] covers
+    def GetCellRange(self, box: list) -> tuple:
+        return (
+            int(box[0]//self.cellSize), int(box[1]//self.cellSize),
+            int((box[0]+box[2])//self.cellSize), int((box[1]+box[3])//self.cellSize)
+        )
+
+    # adds an object to the grid
+    def Insert(self, obj: object, box: list) -> None:
+        cellRange = self.GetCellRange(box)
+        self.objectCells[obj] = cellRange
+        for x in range(cellRange[0], cellRange[2]+1):
+            for y in range(cellRange[1], cellRange[3]+1):
+                self.cells.setdefault((x, y), {})[obj] = None
+
+    # removes an object from the grid
+    def Remove(self, obj: object) -> None:
+        cellRange = self.objectCells.pop(obj, None)
+        if not cellRange: return
+        for x in range(cellRange[0], cellRange[2]+1):
+            for y in range(cellRange[1], cellRange[3]+1):
+                cell = self.cells[(x, y)]
+                del cell[obj]
+                if not cell: del self.cells[(x, y)]
+
+    # updates an object's position (only changes the cells when it moves into new ones)
+    def Move(self, obj: object, box: list) -> None:
+        if self.objectCells.get(obj) == self.GetCellRange(box): return
+        self.Remove(obj)
+        self.Insert(obj, box)
+
+    # gets all the objects in the cells a box covers
+    def Query(self, box: list) -> dict:
+        cellRange = self.GetCellRange(box)
+        if cellRange[0] == cellRange[2] and cellRange[1] == cellRange[3]:
+            return self.cells.get((cellRange[0], cellRange[1]), {})  # skipping the merging for a single cell
+        
+        found = {}
+        for x in range(cellRange[0], cellRange[2]+1):
+            for y in range(cellRange[1], cellRange[3]+1):
+                cell = self.cells.get((x, y))
+                if cell: found.update(cell)
+        return found
+
+
+# which parts of a line are covered by a set of intervals (a segment tree over the sorted interval ends, used to sweep boxes into a union)
+class CoverTree:
+    def __init__(self, coordinates: list) -> None:
+        self.coordinates = coordinates  # leaf i covers coordinates[i] to coordinates[i+1]
+        self.size = max(len(coordinates) - 1, 1)
+        self.counts = [0] * (4 * self.size)  # how many intervals fully cover each node
+        self.covered = [False] * (4 * self.size)  # if any part of each node is covered
+
+    # adds (delta=1) or removes (delta=-1) an interval covering the leaves from low up to high
+    def Update(self, low: int, high: int, delta: int) -> None:
+        self.UpdateNode(low, high, delta, 1, 0, self.size)
+
+    def UpdateNode(self, low: int, high: int, delta: int, node: int, nodeLow: int, nodeHigh: int) -> None:
+        if low <= nodeLow and nodeHigh <= high: self.counts[node] += delta
+        else:
+            middle = (nodeLow + nodeHigh) // 2
+            if low < middle: self.UpdateNode(low, high, delta, node*2, nodeLow, middle)
+            if high > middle: self.UpdateNode(low, high, delta, node*2+1, middle, nodeHigh)
+        
+        # a node is covered if an interval spans all of it or part of one of its children is
+        self.covered[node] = self.counts[node] > 0 or (nodeHigh - nodeLow > 1 and (self.covered[node*2] or self.covered[node*2+1]))
+
+    # gets the covered parts as merged (start, end) spans, only walking down into nodes that are partly covered
+    def GetSpans(self) -> list:
+        spans = []
+        counts, covered, coordinates = self.counts, self.covered, self.coordinates
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, nodeLow, nodeHigh = stack.pop()
+            if not covered[node]: continue
+            if counts[node]:
+                start, end = coordinates[nodeLow], coordinates[nodeHigh]
+                if spans and spans[-1][1] == start: spans[-1] = (spans[-1][0], end)
+                else: spans.append((start, end))
+                continue
+            
+            # pushing the right child first so the spans come out from top to bottom
+            middle = (nodeLow + nodeHigh) // 2
+            stack.append((node*2+1, middle, nodeHigh))
+            stack.append((node*2, nodeLow, middle))
+        return spans
+
+
+# the result of a raycast
+class RaycastHit:
+    def __init__(self, position: list, gridPosition: list, tile: int, fraction: float) -> None:
+        self.position = position  # where the ray hit
+        self.gridPosition = gridPosition  # the tile the ray hit
+        self.tile = tile  # the tile number (None if the ray left the map)
+        self.fraction = fraction  # how far along the ray the hit was (0-1)
+
+
+# =============================================================================
+#                               Surface Pooling
+#=============================================================================
+
+
+# keeps scratch surfaces around so they can be reused instead of creating new ones every frame
+class SurfacePool:
+    def __init__(self, maxPerSize: int=4) -> None:
+        self.maxPerSize = maxPerSize  # how many free surfaces of each size are held onto
+        self.freeSurfaces = {}  # (width, height, colorkey) -> list of free surfaces
+
+        # counters to check how often surfaces are being reused
+        self.hits = 0
+        self.misses = 0
+
+    # gets a free surface (the contents are left over from whatever last used it)
+    def Acquire(self, size: tuple, colorkey: tuple=None) -> pygame.Surface:
+        if colorkey: colorkey = (colorkey[0], colorkey[1], colorkey[2], 255)  # matching the format get_colorkey returns
+        freeSurfaces = self.freeSurfaces.get((size[0], size[1], colorkey))
+        if freeSurfaces:
+            self.hits += 1
+            return freeSurfaces.pop()
+
+        # creating a new surface since there wasn't a free one
+        self.misses += 1
+        surface = pygame.Surface(size)
+        surface = surface.convert()
+        if colorkey: surface.set_colorkey(colorkey)
+        return surface
+
+    # gives a surface back to the pool
+    def Release(self, surface: pygame.Surface) -> None:
+        key = (surface.get_width(), surface.get_height(), surface.get_colorkey())
+        freeSurfaces = self.freeSurfaces.get(key)
+        if freeSurfaces is None: self.freeSurfaces[key] = [surface]
+        elif len(freeSurfaces) < self.maxPerSize: freeSurfaces.append(surface)
+
+    # lets go of every free surface (the sizes in use change when the screen is resized or zoomed)
+    def Clear(self) -> None:
+        self.freeSurfaces.clear()
+
+
+# =============================================================================
+#                               Object Pooling
+#=============================================================================
+
+
+# a free list of objects of one class so short lived particles can be reused instead of allocated every time
+class ObjectPool:
+    def __init__(self, objectClass: type, maxFree: int=512) -> None:
+        self.objectClass = objectClass
+        self.maxFree = maxFree  # how many free objects are held onto
+        self.freeObjects = []
+
+        # counters to check how often objects are being reused
+        self.hits = 0
+        self.misses = 0
+
+    # gets an object (re-initializing a free one if there is one)
+    def Acquire(self, *args, **kwargs) -> object:
+        if self.freeObjects:
+            self.hits += 1
+            obj = self.freeObjects.pop()
+            obj.__init__(*args, **kwargs)
+            return obj
+        
+        self.misses += 1
+        return self.objectClass(*args, **kwargs)
+
+    # gives an object back to the pool (it can't be used after this)
+    def Release(self, obj: object) -> None:
+        if len(self.freeObjects) < self.maxFree: self.freeObjects.append(obj)
+
+
+# =============================================================================
+#                               Text Rendering
+#=============================================================================
+
+
+# caches the fonts and the rendered surface of each string so the same text isn't rasterized over and over
+class TextCache:
+    def __init__(self, maxStrings: int=512) -> None:
+        self.maxStrings = maxStrings
+        self.fonts = {}  # (font, size) -> pygame font
+        self.strings = collections.OrderedDict()  # (font, size, text, color) -> surface, ordered from least to most recently used
+
+        # counters to check how often renders are being reused
+        self.hits = 0
+        self.misses = 0
+
+    # gets a font (looking next to the game and then in Pygen's folder, and warning before falling back to pygame's default font if it can't be loaded)
+    def GetFont(self, font: str, size: int) -> pygame.font.Font:
+        key = (font, size)
+        if key not in self.fonts:
+            path = font
+            if not os.path.exists(path): path = os.path.join(os.path.dirname(UI.__file__), font)
+            try: self.fonts[key] = pygame.font.Font(path, size)
+            except (FileNotFoundError, OSError) as error:
+                print(f"Warning: couldn't load the font {font} ({error}), using pygame's default font instead")
+                self.fonts[key] = pygame.font.Font(None, size)
+        return self.fonts[key]
+
+    # renders a whole string (so kerning matches font.render), reusing the surface if it was rendered recently
+    def Render(self, size: int, font: str, text: str, color: tuple) -> pygame.Surface:
+        key = (font, size, text, tuple(color))
+        surface = self.strings.get(key)
+        if surface:
+            self.hits += 1
+            self.strings.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        surface = self.GetFont(font, size).render(text, False, color)
+        self.strings[key] = surface
+        if len(self.strings) > self.maxStrings: self.strings.popitem(last=False)
+        return surface
+
+    # draws text onto a surface (the same arguments as UI.DrawText)
+    def DrawText(self, screen: pygame.Surface, size: int, font: str, text: str, position: tuple, color: tuple) -> None:
+        screen.blit(self.Render(size, font, text, color), position)
+
+
+# a piece of text that's only re-rendered when it changes (for things like the fps counter that are drawn every frame)
+class CachedText:
+    def __init__(self, size: int, font: str, color: tuple) -> None:
+        self.size = size
+        self.font = font
+        self.color = color
+        self.text = None
+        self.surface = None
+
+    # draws the text, re-rendering it if it's different from last time (returns the area drawn to)
+    def Render(self, screen: pygame.Surface, text: str, position: tuple) -> pygame.Rect:
+        if text != self.text:
+            self.text = text
+            self.surface = textCache.Render(self.size, self.font, text, self.color)
+        return screen.blit(self.surface, position)
+
+
+# a piece of hud text at a fixed position (set its text through QueueText, Render returns the area drawn to so it can be marked dirty)
+class HudText:
+    def __init__(self, size: int, font: str, text: str, position: tuple, color: tuple, centered: bool=False) -> None:
+        self.size = size
+        self.font = font
+        self.text = text
+        self.position = position
+        self.color = color
+        self.centered = centered
+        self.Update()
+
+    # re-renders the text
+    def Update(self) -> None:
+        self.surface = textCache.Render(self.size, self.font, self.text, self.color)
+
+    # draws the text
+    def Render(self, screen: pygame.Surface) -> pygame.Rect:
+        if self.centered: return screen.blit(self.surface, self.surface.get_rect(center=self.position))
+        return screen.blit(self.surface, self.position)
+
+
+# text renderers whose text changed this frame (re-rendered together before the ui is drawn so a burst of changes only rasterizes each one once)
+queuedTexts = set()
+
+# sets the text of a text renderer and queues it to be re-rendered
+def QueueText(textRenderer: object, text: str) -> None:
+    textRenderer.text = text
+    queuedTexts.add(textRenderer)
+
+
+# re-renders every queued text renderer
+def FlushTexts() -> None:
+    for textRenderer in queuedTexts:
+        textRenderer.Update()
+    queuedTexts.clear()
+
+
 # =============================================================================
 #                               Light Objects
 #=============================================================================
 
 
+# creates the falloff sprites for radial lights and shares them between lights with the same radius, color and step
+# only the most recently used sprites are kept (lights that already have a sprite keep it even if it gets dropped from here)
+class LightSpriteCache:
+    def __init__(self, maxSprites: int=32) -> None:
+        self.maxSprites = maxSprites
+        self.sprites = collections.OrderedDict()  # (radius, color, step) -> surface, ordered from least to most recently used
+
+        # counters to check how often sprites are being shared
+        self.hits = 0
+        self.misses = 0
+
+    # gets the sprite for a light (creating it if it isn't cached)
+    def Get(self, radius: int, color: tuple, step: int) -> pygame.Surface:
+        key = (radius, tuple(color), step)
+        surface = self.sprites.get(key)
+        if surface:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        surface = self.CreateSprite(radius, color, step)
+        self.sprites[key] = surface
+        if len(self.sprites) > self.maxSprites: self.sprites.popitem(last=False)
+        return surface
+
+    # generates the falloff of a light (rings that get darker with the square of the distance)
+    def CreateSprite(self, radius: int, color: tuple, step: int) -> pygame.Surface:
+        newRadius = radius//step
+        surface = pygame.Surface([newRadius*2, newRadius*2])
+        surface = surface.convert()
+        if numpy is not None:
+            # working out the ring each pixel is in all at once
+            offsets = numpy.arange(newRadius*2) - newRadius + 0.5
+            rings = numpy.maximum(numpy.ceil(numpy.sqrt(offsets[:, None]**2 + offsets[None, :]**2)), 1)
+            brightness = numpy.where(rings <= newRadius, (1 - rings/newRadius)**2, 0)
+            pygame.surfarray.blit_array(surface, (brightness[:, :, None] * numpy.array(color[:3], dtype=float)).astype(numpy.uint8))
+        else:
+            for r in range(newRadius, 0, -1):
+                brightness = pow(1-r/newRadius, 2)
+                pygame.draw.circle(surface, (color[0] * brightness, color[1] * brightness, color[2] * brightness), [newRadius, newRadius], r)
+        return pygame.transform.scale(surface, (radius*2, radius*2))
+
+
 # stores a radial light sprite
 class RadialLight:
     def __init__(self, radius: int, color: tuple, step: int, renderShadows: bool=True) -> None:
@@ -156,37 +506,39 @@ class RadialLight:
         self.step = step
         self.renderShadows = renderShadows
 
-        self.lightFeild = pygame.Surface([self.radius*2, self.radius*2])
-        self.lightFeild = self.lightFeild.convert()
-
-        # generating the radia light
-        newRadius = radius//step
-        self.surface = pygame.Surface([newRadius*2, newRadius*2])
-        self.surface = self.surface.convert()
-        for r in range(newRadius, 0, -1):
-            brightness = pow(1-r/newRadius, 2)
-            pygame.draw.circle(self.surface, (color[0] * brightness, color[1] * brightness, color[2] * brightness), [newRadius, newRadius], r)
-        self.surface = pygame.transform.scale(self.surface, (radius*2, radius*2))
+        # getting the radial light (shared with every other light that looks the same, so it can't be drawn on)
+        self.surface = lightSprites.Get(radius, color, step)
     
-    # rendering the radial light
-    def Render(self, lightMap: pygame.Surface, pos: tuple) -> None:
+    # gets the top left of the light on the light map (None if the light is out of range of the camera)
+    def GetTransformedPosition(self, pos: tuple) -> list:
         # checking if the object is within range
         screenDst = (zoomedScreenSize[0]*0.5)**2 + (zoomedScreenSize[1]*0.5)**2
         lightDst = (cameraPos[0]-pos[0])**2 + (cameraPos[1]-pos[1])**2 - self.radius*self.radius*1.5
-        if lightDst > screenDst: return  # ending it and not rendering the object sense it's out of range of the camera
+        if lightDst > screenDst: return None  # the light is out of range of the camera
         
-        transPos = [round(pos[0] - cameraPos[0] + zoomedScreenSize[0]//2 - self.radius), round(pos[1] - cameraPos[1] + zoomedScreenSize[1]//2 - self.radius)]
+        return [round(pos[0] - cameraPos[0] + zoomedScreenSize[0]//2 - self.radius), round(pos[1] - cameraPos[1] + zoomedScreenSize[1]//2 - self.radius)]
+
+    # renders the light and the shadows of all the solid objects into a light feild
+    def RenderShadows(self, lightFeild: pygame.Surface, pos: tuple) -> None:
+        lightFeild.blit(self.surface, [0, 0])
+        for obj in objectGrid.Query([pos[0] - self.radius, pos[1] - self.radius, self.radius*2, self.radius*2]):
+            obj.RenderShadow(lightFeild, pos, self.radius)
+
+    # rendering the radial light
+    def Render(self, lightMap: pygame.Surface, pos: tuple) -> None:
+        transPos = self.GetTransformedPosition(pos)
+        if not transPos: return  # ending it and not rendering the object sense it's out of range of the camera
         litAreas.append([transPos[0], transPos[1], self.radius*2, self.radius*2])
 
         if not self.renderShadows:
             lightMap.blit(self.surface, [transPos[0], transPos[1]], special_flags=pygame.BLEND_ADD)
             return
         
-        # rendering the light
-        self.lightFeild.blit(self.surface, [0, 0])
-        for obj in solidObjects:
-            obj.RenderShadow(self.lightFeild, pos, self.radius)
-        lightMap.blit(self.lightFeild, [transPos[0], transPos[1]], special_flags=pygame.BLEND_ADD)
+        # rendering the light (using a pooled light feild since it's re-drawn every frame anyways)
+        lightFeild = surfacePool.Acquire((self.radius*2, self.radius*2))
+        self.RenderShadows(lightFeild, pos)
+        lightMap.blit(lightFeild, [transPos[0], transPos[1]], special_flags=pygame.BLEND_ADD)
+        surfacePool.Release(lightFeild)
 
 
 # a light with a fixed position
@@ -194,8 +546,158 @@ class Light (RadialLight):
     def __init__(self, radius: int, color: tuple, step: int, renderShadows: bool, pos: tuple) -> None:
         super().__init__(radius, color, step, renderShadows=renderShadows)
         self.pos = pos
+        self.shadowsBaked = False  # the shadows only need to be re-rendered when an object near the light changes
+
+        # the light with its shadows baked in
+        if self.renderShadows:
+            self.lightFeild = pygame.Surface([self.radius*2, self.radius*2])
+            self.lightFeild = self.lightFeild.convert()
+
+    # checks if an object is close enough to cast a shadow from the light
+    def InRange(self, obj: object) -> bool:
+        dif = [obj.centerPosition[0] - self.pos[0], obj.centerPosition[1] - self.pos[1]]
+        return dif[0]**2 + dif[1]**2 <= self.radius**2 + obj.totalLength
+
+    # renders the shadows once so they can be reused every frame
+    def Bake(self) -> None:
+        if self.renderShadows: self.RenderShadows(self.lightFeild, self.pos)
+        self.shadowsBaked = True
+
+    # forces the shadows to be re-baked the next time the light is baked into the static light map
+    def Invalidate(self) -> None:
+        self.shadowsBaked = False
+
+    # gets the final surface of the light (with the shadows baked in if it has them)
+    def GetBakedSurface(self) -> pygame.Surface:
+        if not self.renderShadows: return self.surface
+        if not self.shadowsBaked: self.Bake()
+        return self.lightFeild
+
+
+# all the fixed lights of a level baked into a world space light map (split into chunks so only the visible part is copied each frame)
+class StaticLightMap:
+    def __init__(self, lights: list, chunkSize: int=512) -> None:
+        self.lights = lights
+        self.chunkSize = chunkSize
+        self.chunks = {}  # (chunk x, chunk y) -> surface; chunks with no light in them aren't stored since they'd be black
+        self.chunkBounds = {}  # (chunk x, chunk y) -> the part of the chunk that has light in it (so the black parts aren't copied)
+        self.chunkLitAreas = {}  # (chunk x, chunk y) -> the world space boxes of the lights in the chunk (clipped to it)
+
+        # baking every chunk touched by a light
+        for light in self.lights:
+            for chunk in self.GetTouchedChunks(light):
+                if chunk not in self.chunks: self.BakeChunk(chunk)
+    
+    # gets the chunks a light's square covers
+    def GetTouchedChunks(self, light: Light) -> list:
+        left, top = (light.pos[0] - light.radius)//self.chunkSize, (light.pos[1] - light.radius)//self.chunkSize
+        right, bottom = (light.pos[0] + light.radius - 1)//self.chunkSize, (light.pos[1] + light.radius - 1)//self.chunkSize
+        return [(x, y) for x in range(left, right+1) for y in range(top, bottom+1)]
+    
+    # re-renders all the lights that touch a chunk
+    def BakeChunk(self, chunk: tuple) -> None:
+        surface = self.chunks.get(chunk)
+        if not surface:
+            surface = pygame.Surface((self.chunkSize, self.chunkSize))
+            surface = surface.convert()
+            self.chunks[chunk] = surface
+        surface.fill((0, 0, 0))
+
+        chunkPos = [chunk[0]*self.chunkSize, chunk[1]*self.chunkSize]
+        bounds = None
+        litAreas = []
+        for light in self.lights:
+            if chunk in self.GetTouchedChunks(light):
+                lightBox = pygame.Rect(light.pos[0] - light.radius - chunkPos[0], light.pos[1] - light.radius - chunkPos[1], light.radius*2, light.radius*2)
+                surface.blit(light.GetBakedSurface(), lightBox.topleft, special_flags=pygame.BLEND_ADD)
+                bounds = bounds.union(lightBox) if bounds else lightBox
+                litAreas.append(lightBox.clip(surface.get_rect()).move(chunkPos))
+        self.chunkBounds[chunk] = bounds.clip(surface.get_rect()) if bounds else pygame.Rect(0, 0, 0, 0)
+        self.chunkLitAreas[chunk] = litAreas
+
+    # re-bakes some lights and the chunks they touch after something changed their shadows (each chunk is only re-baked once)
+    def Invalidate(self, lights: list) -> None:
+        chunks = set()
+        for light in lights:
+            light.Invalidate()
+            chunks.update(self.GetTouchedChunks(light))
+        for chunk in chunks:
+            self.BakeChunk(chunk)
+
+    # copies the visible part of the light map onto the screen's light map (the light map is expected to be cleared first)
     def Render(self, lightMap: pygame.Surface) -> None:
-        super().Render(lightMap, self.pos)
+        topLeft = [round(cameraPos[0] - zoomedScreenSize[0]//2), round(cameraPos[1] - zoomedScreenSize[1]//2)]
+        left, top = topLeft[0]//self.chunkSize, topLeft[1]//self.chunkSize
+        right, bottom = (topLeft[0] + zoomedScreenSize[0])//self.chunkSize, (topLeft[1] + zoomedScreenSize[1])//self.chunkSize
+        for x in range(int(left), int(right)+1):
+            for y in range(int(top), int(bottom)+1):
+                if (x, y) in self.chunks:
+                    bounds = self.chunkBounds[(x, y)]
+                    lightMap.blit(self.chunks[(x, y)], [x*self.chunkSize - topLeft[0] + bounds.x, y*self.chunkSize - topLeft[1] + bounds.y], bounds)
+
+                    # marking the areas that are lit so the ground and tiles get drawn there
+                    for area in self.chunkLitAreas[(x, y)]:
+                        litAreas.append([area.x - topLeft[0], area.y - topLeft[1], area.w, area.h])
+
+
+# an alternative to the light map surface that adds the lights up in a numpy buffer and then multiplies the screen by it in one go
+# it has the same blit method as a surface so all the lights can render into it without knowing the difference
+# the total can go over 255 (hdr) and only gets clamped or tone mapped at the end, and it can run at a lower resolution and be scaled back up
+class LightBuffer:
+    def __init__(self, size: tuple, downscale: int=1, toneMap: bool=False) -> None:
+        self.downscale = max(int(downscale), 1)
+        self.toneMap = toneMap  # smoothly rolling off bright areas instead of clamping them
+        self.Resize(size)
+
+    # changes the size of the buffer (the size is in screen pixels)
+    def Resize(self, size: tuple) -> None:
+        self.size = (int(size[0]), int(size[1]))
+        self.buffer = numpy.zeros((math.ceil(self.size[0] / self.downscale), math.ceil(self.size[1] / self.downscale), 3), dtype=numpy.uint16)
+
+        # the surfaces the final light gets put into so the multiply can be done by sdl
+        self.surface = pygame.Surface(self.buffer.shape[:2])
+        self.surface = self.surface.convert()
+        self.scaledSurface = None
+        if self.downscale > 1:
+            self.scaledSurface = pygame.Surface(self.size)
+            self.scaledSurface = self.scaledSurface.convert()
+
+    # clearing the lights from the last frame
+    def Clear(self) -> None:
+        self.buffer.fill(0)
+
+    # adds a light's surface into the buffer (every blit is additive regardless of the flags)
+    def blit(self, source: pygame.Surface, dest: tuple, area: pygame.Rect=None, special_flags: int=0) -> None:
+        area = pygame.Rect(area) if area else source.get_rect()
+        x, y = int(dest[0]), int(dest[1])
+
+        # clipping to the screen and snapping to the pixels of the buffer
+        scale = self.downscale
+        left, top = math.ceil(max(x, 0) / scale), math.ceil(max(y, 0) / scale)
+        right, bottom = math.ceil(min(x + area.w, self.size[0]) / scale), math.ceil(min(y + area.h, self.size[1]) / scale)
+        if right <= left or bottom <= top: return
+        
+        # sampling every scale'th pixel of the source (a view so nothing gets copied)
+        sourceX, sourceY = left*scale - x + area.x, top*scale - y + area.y
+        pixels = pygame.surfarray.pixels3d(source)
+        self.buffer[left:right, top:bottom] += pixels[sourceX:sourceX + (right - left - 1)*scale + 1:scale, sourceY:sourceY + (bottom - top - 1)*scale + 1:scale]
+        del pixels  # unlocking the surface
+
+    # multiplies the screen by the light
+    def ApplyTo(self, screen: pygame.Surface) -> None:
+        if self.toneMap:
+            # reinhard with a white point of two full lights so overlapping lights still show a bit of difference
+            light = self.buffer.astype(numpy.float32) / 255
+            light = numpy.minimum(light * (1 + light / 4) / (1 + light) * 255, 255)
+        else: light = numpy.minimum(self.buffer, 255)
+        pygame.surfarray.blit_array(self.surface, light.astype(numpy.uint8))
+
+        # scaling the light back up and multiplying the whole screen by it in one blit
+        surface = self.surface
+        if self.scaledSurface:
+            pygame.transform.scale(self.surface, self.size, self.scaledSurface)
+            surface = self.scaledSurface
+        screen.blit(surface, [0, 0], special_flags=pygame.BLEND_MULT)
 
 
 # =============================================================================
@@ -224,11 +726,21 @@ class ShadowedObject:
         # getting the length from center to the outside of the object
         self.totalLength = (self.size[0]//2)**2 + (self.size[1]//2)**2
         self.centerPosition = [self.pos[0] + self.size[0]//2, self.pos[1] + self.size[1]//2]
+
+        # the hitboxes in world space as (x, y, width, height) (used when sweeping entities against the object)
+        self.worldHitBoxes = []
+        if self.collideable and self.hitBox:
+            self.worldHitBoxes = [(self.pos[0] + box.pos[0], self.pos[1] + box.pos[1], box.size[0], box.size[1]) for box in self.hitBox]
+    
+    # gets the box the object covers (used for the spatial grid)
+    def GetBox(self) -> list:
+        return [self.pos[0], self.pos[1], self.size[0], self.size[1]]
     
     # checks collision wiht a given point
     def CheckCollision(self, point: tuple) -> bool:
-        #return self.collideable and point[0] >= self.pos[0] and point[0] <= self.pos[0] + self.size[0] and point[1] >= self.pos[1] and point[1] <= self.pos[1] + self.size[1]
-        return self.collideable and self.hitBox.Collide([point[0]-self.pos[0], point[1]-self.pos[1]])
+        for box in self.worldHitBoxes:  # (empty when the object isn't collideable)
+            if box[0] <= point[0] <= box[0] + box[2] and box[1] <= point[1] <= box[1] + box[3]: return True
+        return False
     
     # rendering the object
     def Render(self, screen: pygame.Surface) -> None:
@@ -312,13 +824,102 @@ class ShadowedObject:
         points = list(map(lambda p: [p[0] - position[0] + radius, p[1] - position[1] + radius], points))
         
         # rendering the polygon
-        surf = pygame.Surface((surfSize, surfSize))
-        surf = surf.convert()
+        surf = surfacePool.Acquire((surfSize, surfSize), (255, 255, 255))
         surf.fill((255, 255, 255))
-        surf.set_colorkey((255, 255, 255))
         pygame.draw.polygon(surf, (0, 0, 0), points)
         pygame.draw.rect(surf, (255, 255, 255), [self.pos[0] - position[0] + radius, self.pos[1] - position[1] + radius, self.size[0], self.size[1]])
         lightMap.blit(surf, [0, 0])
+        surfacePool.Release(surf)
+
+
+# =============================================================================
+#                               Tile Chunks
+#=============================================================================
+
+
+# the tiles in one row of a chunk that have the same depth (drawn sorted with the entities so they can walk behind them)
+class TileStrip:
+    def __init__(self, surface: pygame.Surface, position: list, depth: float) -> None:
+        self.surface = surface
+        self.position = position  # the world position of the top left
+        self.depth = depth
+
+    # rendering the strip
+    def Render(self, screen: pygame.Surface) -> None:
+        screen.blit(self.surface, [round(self.position[0] - cameraPos[0] + zoomedScreenSize[0]//2), round(self.position[1] - cameraPos[1] + zoomedScreenSize[1]//2)])
+
+
+# the tile map pre-rendered into chunks (a flat ground layer plus strips of the taller tiles) so drawing the map is a few blits a frame
+# chunks are baked the first time they're seen and re-baked when one of their tiles changes
+class TileChunkCache:
+    def __init__(self, chunkTiles: int=8) -> None:
+        self.chunkTiles = chunkTiles
+        self.chunkSize = chunkTiles * tileMap.tileSize
+        self.chunks = {}  # (chunk x, chunk y) -> (ground surface, tile strips)
+
+    # gets a tile from the map (0 if it's outside the map)
+    def GetTile(self, x: int, y: int) -> int:
+        if y < 0 or x < 0 or y >= len(tileMap.map) or x >= len(tileMap.map[y]): return 0
+        return tileMap.map[y][x]
+
+    # renders the tiles of a chunk
+    def BakeChunk(self, chunk: tuple) -> tuple:
+        tileSize = tileMap.tileSize
+        ground = pygame.Surface((self.chunkSize, self.chunkSize))
+        ground = ground.convert()
+
+        # drawing the ground and the flat tiles and grouping the rest by their row and depth
+        rows = {}  # (row, depth) -> [(x, tile)]
+        for y in range(self.chunkTiles):
+            for x in range(self.chunkTiles):
+                cellX, cellY = chunk[0]*self.chunkTiles + x, chunk[1]*self.chunkTiles + y
+                ground.blit(groundTiles[(cellX + cellY) % 4], [x*tileSize, y*tileSize])
+
+                tile = self.GetTile(cellX, cellY)
+                if not tile: continue
+                center = tileCenters.get(tile, -9999999)
+                if center == -9999999: ground.blit(tiles[tile], [x*tileSize, y*tileSize])  # flat tiles are always under everything
+                else: rows.setdefault((y, cellY*tileSize + center), []).append((x, tile))
+        
+        # creating the strips for the tiles that get sorted by depth
+        strips = []
+        for (y, depth), row in rows.items():
+            left = min(x for x, tile in row)
+            right = max(x for x, tile in row)
+            surface = pygame.Surface(((right - left + 1) * tileSize, tileSize), pygame.SRCALPHA)
+            for x, tile in row:
+                surface.blit(tiles[tile], [(x - left) * tileSize, 0])
+            strips.append(TileStrip(surface, [(chunk[0]*self.chunkTiles + left) * tileSize, (chunk[1]*self.chunkTiles + y) * tileSize], depth))
+
+        self.chunks[chunk] = (ground, strips)
+        return self.chunks[chunk]
+
+    # marks the chunk a tile is in to be re-baked
+    def Invalidate(self, gridPosition: tuple) -> None:
+        self.chunks.pop((gridPosition[0] // self.chunkTiles, gridPosition[1] // self.chunkTiles), None)
+
+    # draws the ground inside each area and returns the tile strips that need to be depth sorted
+    def Render(self, zoomDisplay: pygame.Surface, areas: list) -> list:
+        offset = [round(zoomedScreenSize[0]//2 - cameraPos[0]), round(zoomedScreenSize[1]//2 - cameraPos[1])]
+        visibleStrips = {}  # a dict so each strip is only added once and the order stays the same
+        for area in areas:
+            area = pygame.Rect(area)
+            left, top = (area.left - offset[0]) // self.chunkSize, (area.top - offset[1]) // self.chunkSize
+            right, bottom = (area.right - 1 - offset[0]) // self.chunkSize, (area.bottom - 1 - offset[1]) // self.chunkSize
+            for chunkY in range(top, bottom+1):
+                for chunkX in range(left, right+1):
+                    ground, strips = self.chunks.get((chunkX, chunkY)) or self.BakeChunk((chunkX, chunkY))
+
+                    # only drawing the part of the chunk in the area
+                    chunkRect = pygame.Rect(chunkX*self.chunkSize + offset[0], chunkY*self.chunkSize + offset[1], self.chunkSize, self.chunkSize)
+                    clipped = area.clip(chunkRect)
+                    zoomDisplay.blit(ground, clipped.topleft, clipped.move(-chunkRect.left, -chunkRect.top))
+
+                    for strip in strips:
+                        stripRect = pygame.Rect(strip.position[0] + offset[0], strip.position[1] + offset[1], strip.surface.get_width(), strip.surface.get_height())
+                        if stripRect.colliderect(area): visibleStrips[strip] = None
+        
+        return [[strip, strip.depth, zoomDisplay] for strip in visibleStrips]
 
 
 # =============================================================================
@@ -328,6 +929,8 @@ class ShadowedObject:
 
 # a basic entity class
 class Entity:
+    __slots__ = ("position", "velocity", "sprite", "light", "collision", "spriteSize", "hitBoxShift", "hitBoxSize")  # so pooled particles stay small (subclasses without slots still get a normal dict)
+
     def __init__(self, sprite: pygame.Surface, position: list, velocity: list, collision: bool=False, hitBoxSize=[], hitBoxShift=[0,0], light: object=None) -> None:
         self.position = position
         self.velocity = velocity
@@ -346,154 +949,28 @@ class Entity:
 
     # updating the entity
     def Update(self, events: Events.Manager, dt: float, collidables: list=[]) -> None:
-        global hitBoxesToRender
-        
         # moving the entity
         deltaX = self.velocity[0] * dt
         deltaY = self.velocity[1] * dt
-        newX = self.position[0] + deltaX
-        newY = self.position[1] + deltaY
 
         # checking for collision
-        spriteSize = [self.spriteSize[0]//2, self.spriteSize[1]//2]
-        if self.collision:  # checking for collision with tiles (huge pain)
-            # finding all the tiles that are touched
+        if self.collision:  # sweeping the hitbox against the tiles and objects so it can't skip through thin walls
             hitBoxSize = [self.hitBoxSize[0]//2, self.hitBoxSize[1]//2]
+            hitBox = (self.position[0] + self.hitBoxShift[0] - hitBoxSize[0], self.position[1] + self.hitBoxShift[1] - hitBoxSize[1], self.hitBoxSize[0], self.hitBoxSize[1])
+            moveX, moveY, blockedX, blockedY = MoveAndSlide(hitBox, deltaX, deltaY, collidables)
 
-            baseXL = (self.position[0] + self.hitBoxShift[0] - hitBoxSize[0])//tileMap.tileSize*tileMap.tileSize
-            baseYL = (self.position[1] + self.hitBoxShift[1] - hitBoxSize[1])//tileMap.tileSize*tileMap.tileSize
-            baseNewXL = (newX + self.hitBoxShift[0] - hitBoxSize[0])//tileMap.tileSize*tileMap.tileSize
-            baseNewYL = (newY + self.hitBoxShift[1] - hitBoxSize[1])//tileMap.tileSize*tileMap.tileSize
-
-            baseXB = (self.position[0] + self.hitBoxShift[0] + hitBoxSize[0])//tileMap.tileSize*tileMap.tileSize
-            baseYB = (self.position[1] + self.hitBoxShift[1] + hitBoxSize[1])//tileMap.tileSize*tileMap.tileSize
-            baseNewXB = (newX + self.hitBoxShift[0] + hitBoxSize[0])//tileMap.tileSize*tileMap.tileSize
-            baseNewYB = (newY + self.hitBoxShift[1] + hitBoxSize[1])//tileMap.tileSize*tileMap.tileSize
-            
-            # stretching the hitboxes to the new position
-            posX, posY = self.position[0], self.position[1]
-            if deltaX < 0: posX += deltaX
-            if deltaY < 0: posY += deltaY
-            selfHitBoxX = self.hitBox =  HitBox([posX             + self.hitBoxShift[0] - hitBoxSize[0], self.position[1] + self.hitBoxShift[1] - hitBoxSize[1]], [self.hitBoxSize[0] + abs(deltaX), self.hitBoxSize[1]              ])
-            selfHitBoxY = self.hitBox =  HitBox([self.position[0] + self.hitBoxShift[0] - hitBoxSize[0], posY             + self.hitBoxShift[1] - hitBoxSize[1]], [self.hitBoxSize[0]              , self.hitBoxSize[1] + abs(deltaY)])
-            selfHitBoxXY = self.hitBox = HitBox([posX             + self.hitBoxShift[0] - hitBoxSize[0], posY             + self.hitBoxShift[1] - hitBoxSize[1]], [self.hitBoxSize[0] + abs(deltaX), self.hitBoxSize[1] + abs(deltaY)])
-
-            # checking collisions for new x
-            xBoxes = []
-            ts = 1#tileMap.tileSize
-            hitBoxes = GetTileMapCollisionHitbox([baseNewXL, baseYL])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseNewXL//ts)*ts, hitBox.pos[1] + (baseYL//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    xBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseNewXL, baseYB])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseNewXL//ts)*ts, hitBox.pos[1] + (baseYB//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    xBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseNewXB, baseYL])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseNewXB//ts)*ts, hitBox.pos[1] + (baseYL//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    xBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseNewXB, baseYB])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseNewXB//ts)*ts, hitBox.pos[1] + (baseYB//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    xBoxes.append(trueBox)
-            
-            # checking collisions for new y
-            yBoxes = []
-            hitBoxes = GetTileMapCollisionHitbox([baseXL, baseNewYL])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseXL//ts)*ts, hitBox.pos[1] + (baseNewYL//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    yBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseXL, baseNewYB])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseXL//ts)*ts, hitBox.pos[1] + (baseNewYB//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    yBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseXB, baseNewYL])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseXB//ts)*ts, hitBox.pos[1] + (baseNewYL//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    yBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseXB, baseNewYB])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseXB//ts)*ts, hitBox.pos[1] + (baseNewYB//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    yBoxes.append(trueBox)
-
-            # checking collisions for new xy
-            xyBoxes = []
-            hitBoxes = GetTileMapCollisionHitbox([baseNewXL, baseNewYL])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseNewXL//ts)*ts, hitBox.pos[1] + (baseNewYL//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    xyBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseNewXL, baseNewYB])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseNewXL//ts)*ts, hitBox.pos[1] + (baseNewYB//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    xyBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseNewXB, baseNewYL])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseNewXB//ts)*ts, hitBox.pos[1] + (baseNewYL//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    xyBoxes.append(trueBox)
-            hitBoxes = GetTileMapCollisionHitbox([baseNewXB, baseNewYB])
-            if hitBoxes:
-                for hitBox in hitBoxes:
-                    trueBox = [hitBox.pos[0] + (baseNewXB//ts)*ts, hitBox.pos[1] + (baseNewYB//ts)*ts, hitBox.size[0], hitBox.size[1]]
-                    xyBoxes.append(trueBox)
+            if DEV_MODE: hitBoxesToRender.append(list(hitBox))
 
-            if DEV_MODE:
-                hitBoxesToRender.append([self.position[0]+self.hitBoxShift[0]-hitBoxSize[0]                , self.position[1] + self.hitBoxShift[1] - hitBoxSize[1], self.hitBoxSize[0], self.hitBoxSize[1]])
-                hitBoxesToRender += xBoxes
-                hitBoxesToRender += yBoxes
-                hitBoxesToRender += xyBoxes
-
-            # analyzing the results
-            xValid = sum(selfHitBoxX.HitBoxCollision(box) for box in xBoxes) == 0
-            yValid = sum(selfHitBoxY.HitBoxCollision(box) for box in yBoxes) == 0
-            collideXY = sum(selfHitBoxXY.HitBoxCollision(box) for box in xyBoxes) == 0
-            if (xValid and yValid) and (not collideXY): xValid, yValid = False, False
-
-            # checking collisions for objects
-            for obj in solidObjects + collidables:  # update this for the new hitbox shape?
-                if obj.hitBox:  # making sure it actually has a hitbox, otherwise it's not collideable
-                    # checking for collisions on different parts of the entity
-                    if obj.CheckCollision([newX + self.hitBoxShift[0] - hitBoxSize[0], self.position[1] + self.hitBoxShift[1] + hitBoxSize[1]]): xValid = False
-                    if obj.CheckCollision([newX + self.hitBoxShift[0] - hitBoxSize[0], self.position[1] + self.hitBoxShift[1] - hitBoxSize[1]]): xValid = False
-                    if obj.CheckCollision([newX + self.hitBoxShift[0] + hitBoxSize[0], self.position[1] + self.hitBoxShift[1] - hitBoxSize[1]]): xValid = False
-                    if obj.CheckCollision([newX + self.hitBoxShift[0] + hitBoxSize[0], self.position[1] + self.hitBoxShift[1] + hitBoxSize[1]]): xValid = False
-                    
-                    if obj.CheckCollision([self.position[0] + self.hitBoxShift[0] - hitBoxSize[0], newY + self.hitBoxShift[1] + hitBoxSize[1]]): yValid = False
-                    if obj.CheckCollision([self.position[0] + self.hitBoxShift[0] - hitBoxSize[0], newY + self.hitBoxShift[1] - hitBoxSize[1]]): yValid = False
-                    if obj.CheckCollision([self.position[0] + self.hitBoxShift[0] + hitBoxSize[0], newY + self.hitBoxShift[1] - hitBoxSize[1]]): yValid = False
-                    if obj.CheckCollision([self.position[0] + self.hitBoxShift[0] + hitBoxSize[0], newY + self.hitBoxShift[1] + hitBoxSize[1]]): yValid = False
-
-                    if xValid and yValid:
-                        if obj.CheckCollision([newX + self.hitBoxShift[0] - hitBoxSize[0], newY + self.hitBoxShift[1] + hitBoxSize[1]]): xValid, yValid = False, False
-                        if obj.CheckCollision([newX + self.hitBoxShift[0] - hitBoxSize[0], newY + self.hitBoxShift[1] - hitBoxSize[1]]): xValid, yValid = False, False
-                        if obj.CheckCollision([newX + self.hitBoxShift[0] + hitBoxSize[0], newY + self.hitBoxShift[1] - hitBoxSize[1]]): xValid, yValid = False, False
-                        if obj.CheckCollision([newX + self.hitBoxShift[0] + hitBoxSize[0], newY + self.hitBoxShift[1] + hitBoxSize[1]]): xValid, yValid = False, False
-
-            # setting the position
-            if xValid and yValid:
-                self.position = [newX, newY]
-            elif xValid:
-                self.position = [newX, self.position[1]]
-                self.velocity[1] = 0
-            elif yValid:
-                self.position = [self.position[0], newY]
-                self.velocity[0] = 0
-            else:
-                self.velocity[0] = 0
-                self.velocity[1] = 0
-        else: self.position = [newX, newY]
+            # setting the position and stopping the entity along the blocked directions
+            self.position = [self.position[0] + moveX, self.position[1] + moveY]
+            if blockedX: self.velocity[0] = 0
+            if blockedY: self.velocity[1] = 0
+        else: self.position = [self.position[0] + deltaX, self.position[1] + deltaY]
     
+    # gets the box of the entity's sprite (used for the spatial grid)
+    def GetBox(self) -> list:
+        return [self.position[0]-self.spriteSize[0]//2, self.position[1]-self.spriteSize[1]//2, self.spriteSize[0], self.spriteSize[1]]
+
     # checks collision with a point
     def CheckCollision(self, point: tuple) -> bool:
         pos = [self.position[0]-self.spriteSize[0]//2, self.position[1]-self.spriteSize[1]//2]
@@ -523,6 +1000,10 @@ class Entity:
 
 # a class for an enemy
 class Enemy (Entity):
+    # how close mobs can get before they push each other apart and how hard they push
+    separationRadius = 40
+    separationStrength = 0.75
+
     def __init__(self, sprites: pygame.Surface, position: list, damage: float, speed: float, health: float, drops: list, light: object=None, sparkRange: list=[3, 10], weapon: object=None, engagementDst: int = 125) -> None:
         # creating the animation for the mob          {Walking: {"speed": 1, "reset": False, sprites: [1, 2, 3, 4]}}
         animation = {
@@ -544,43 +1025,71 @@ class Enemy (Entity):
         self.weapon = weapon
         self.engagementDst = engagementDst**2
 
-        self.weapon.lastFired = time.time() - 0.1  # so they don't instantly fire upon spawning
+        self.weapon.lastFired = GetTime() - 0.1  # so they don't instantly fire upon spawning
 
     # gets the current animation state
     def GetAnimationState(self, *args) -> int:
         if self.velocity[0] > 0: return EnemyAnimationStates.walkingRight
         return EnemyAnimationStates.walkingLeft
 
+    # takes the damage and knockback from a bullet (the batched mobs keep their health and velocity in the batch)
+    def Hit(self, damage: float, velocity: list) -> None:
+        if mobBatch: mobBatch.Hit(self.batchIndex, damage, velocity)
+        else:
+            self.health -= damage
+            self.velocity = velocity
+
     # updates the mob
     def Update(self, events: Events.Manager, dt: float) -> None:
         super().Update(events, dt)
+        mobGrid.Move(self, self.GetBox())
 
         self.enemyAnimation.Update(events, dt)
-        dif = [player.position[0] - self.position[0], player.position[1] - self.position[1]]
-        length = math.sqrt(dif[0]**2 + dif[1]**2)
-        newVelocity = [dif[0]/length*self.speed, dif[1]/length*self.speed]
+        self.Steer()
+        self.UpdateWeapon(dt)
+
+    # steers the mob towards the player
+    def Steer(self) -> None:
+        # following the flow field around walls (or walking straight at the player once in the same tile or if there's no path)
+        feetPosition = [self.position[0] + self.hitBoxShift[0], self.position[1] + self.hitBoxShift[1]]
+        target = flowField.GetTarget(feetPosition)
+        if target: dif = [target[0] - feetPosition[0], target[1] - feetPosition[1]]
+        else: dif = [player.position[0] - self.position[0], player.position[1] - self.position[1]]
+        length = math.sqrt(dif[0]**2 + dif[1]**2) or 1
+
+        # pushing away from the mobs that are too close so they don't all stack up on the same spot
+        separation = self.GetSeparation()
+        direction = [dif[0]/length + separation[0]*self.separationStrength, dif[1]/length + separation[1]*self.separationStrength]
+        newVelocity = [direction[0]*self.speed, direction[1]*self.speed]
         self.velocity = [self.velocity[0]*0.8 + newVelocity[0]*0.2, self.velocity[1]*0.8 + newVelocity[1]*0.2]
 
+    # finds how much the mob is pushed away from the mobs near it (pushed harder the closer they are)
+    def GetSeparation(self) -> list:
+        radius = self.separationRadius
+        separation = [0, 0]
+        box = self.GetBox()  # (every mob's box holds its position, so growing the box by the radius finds every mob in range)
+        for enemy in mobGrid.Query([box[0] - radius, box[1] - radius, box[2] + radius*2, box[3] + radius*2]):
+            if enemy is self: continue
+            offset = [self.position[0] - enemy.position[0], self.position[1] - enemy.position[1]]
+            distance = math.sqrt(offset[0]**2 + offset[1]**2)
+            push = max(1 - distance / radius, 0) / max(distance, 1)
+            separation = [separation[0] + offset[0]*push, separation[1] + offset[1]*push]
+        return separation
+
+    # fires the mob's weapon if the player is in range and can be seen
+    def UpdateWeapon(self, dt: float) -> None:
         # checking if the mob has a weapon
         if self.weapon:
             # now checking line of sight
             travel = (player.position[0] - self.position[0], player.position[1] - self.position[1])
             travelLength = travel[0]**2 + travel[1]**2  # using the magnitude with everything being squared to reduce square root operations
             if travelLength < self.engagementDst:  # the engagement distance (may need to be fine tuned)
-                # checking if the weapon should be fired
-                if time.time() - self.weapon.lastFired > abs(self.weapon.fireRate) and random.uniform(0, 1) < dt:
-                    for i in range(10):
-                        pos = [self.position[0] + travel[0]*i*0.1, self.position[1] + travel[1]*i*0.1]
-                        if TileMapCollision(pos): return
-                        for obj in solidObjects:  # add tile collision here
-                            if obj.CheckCollision(pos): return  # ending the search if there is a block in the way
-
-                    projectiles = self.weapon.ForceFire(travel, self)
-                    player.projectiles += projectiles
-                    self.weapon.lastFired = time.time()
+                # checking if the weapon should be fired (and that nothing is in the way)
+                if GetTime() - self.weapon.lastFired > abs(self.weapon.fireRate) and random.uniform(0, 1) < dt and lineOfSight.CanSee(self):
+                    worldEntities.Extend(self.weapon.ForceFire(travel, self))
+                    self.weapon.lastFired = GetTime()
             else:
-                self.weapon.lastFired = time.time() - max(abs(self.weapon.fireRate) - 0.25, 0.1)  # resetting the cooldown so that the mob doesn't instantly shoot upon seeing the player
-        # don't put code after here (the method may exit after the weapon firing script)
+                self.weapon.lastFired = GetTime() - max(abs(self.weapon.fireRate) - 0.25, 0.1)  # resetting the cooldown so that the mob doesn't instantly shoot upon seeing the player
 
     # called on kill of the mob
     def Kill(self) -> None:
@@ -593,7 +1102,7 @@ class Enemy (Entity):
 
         # checking for muzzel flash if the mob has a weapon
         if self.weapon:
-            if time.time() - self.weapon.lastFired < 0.1:  # mobs don't reload so ignoring that
+            if GetTime() - self.weapon.lastFired < 0.1:  # mobs don't reload so ignoring that
                 if self.enemyAnimation.state == EnemyAnimationStates.walkingLeft:
                     muzzleFlash.Render(lightMap, [round(self.position[0]), round(self.position[1] + self.spriteSize[1]//2)])
                 else:
@@ -607,16 +1116,34 @@ class Enemy (Entity):
 
 # a particle class
 class Particle (Entity):
+    __slots__ = ("lifeTime", "maxLife", "name", "resting", "wakeTime")
+
     def __init__(self, sprite: pygame.Surface, position: list, velocity: list, maxLife: float, light: object=None, name: str="", collision: bool=False) -> None:
         # initializing the parent classes stuff
         super().__init__(sprite, position, velocity, light=light, collision=collision)
-        self.lifeTime = time.time()  # when the particle was created (used for destroying it)
+        self.lifeTime = GetTime()  # when the particle was created (used for destroying it)
         self.maxLife = maxLife
         self.name = name
+        self.resting = False  # set once the particle has slowed to a stop so it can skip its update
+        self.wakeTime = 0  # when a resting particle has to start updating again
+
+    # puts the particle to rest if it's slowed down enough (returns if it did)
+    def SettleIfSlow(self) -> bool:
+        if abs(self.velocity[0]) + abs(self.velocity[1]) >= restingSpeed: return False
+        self.velocity = [0, 0]
+        self.resting = True
+        self.wakeTime = self.GetWakeTime()
+        return True
+
+    # gets when a resting particle needs to wake back up (by default once it's due to die so it gets culled)
+    def GetWakeTime(self) -> float:
+        return self.lifeTime + self.maxLife
 
 
 # for dropped items
 class DroppedItem (Particle):
+    __slots__ = ("amount", "dropType", "dropName")
+
     def __init__(self, sprite: pygame.Surface, position: list, velocity: list, dropType, dropName, amount: int=1) -> None:
         super().__init__(sprite, position, velocity, maxLife=60*8, collision=True)  # initializing the partent classes stuff
 
@@ -624,40 +1151,25 @@ class DroppedItem (Particle):
         self.dropType = dropType
         self.dropName = dropName
 
-    # adding picking up to the update method
+    # updating the item (picking it up is done for every drop at once in WorldEntities.CollectDrops)
     def Update(self, events: Events.Manager, dt: float, collidables: list=[]) -> None:
         super().Update(events, dt, collidables)
 
         self.velocity = [self.velocity[0] * 0.9, self.velocity[1] * 0.9]
-
-        # checking for collision with the player
-        if player.CheckCollision(self.position):
-            self.maxLife = 0  # killing the item
-
-            # giving the item to the player
-            if self.dropType == DropTypes.Amo:
-                player.amoInventory[self.dropName] += self.amount
-                amoText.text = f"{player.weaponInventory[player.weaponSlot].capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}"
-                amoText.Update()
-            elif self.dropType == DropTypes.Part:
-                player.AddPart(self.dropName, self.amount)
-                #player.partInventory[self.dropName] += self.amount
-            elif self.dropType == DropTypes.Weapon:
-                for i in range(self.amount): player.weaponInventory.append(playerWeapons[self.dropName].Copy())
-            elif self.outputType == DropTypes.Armor:
-                player.AddArmor(self.outputName)
-                #player.armorInventory.append(playerArmors[self.outputName])
+        self.SettleIfSlow()  # resting until it's picked up or something wakes it
 
 
 # a bullet class
 class Bullet (Particle):
+    __slots__ = ("collided", "damage", "firer", "knockback")
+
     def __init__(self, position: list, velocity: list, damage: float, maxLife: float, firer: int, knockback: float) -> None:
         # initializing the parent classes stuff
         #super().__init__(bulletSprite, position, velocity, maxLife, light=bulletLight, name="bullet")
         # without bullet lights
         light = None
         if DEV_MODE: light = bulletLight
-        super().__init__(pygame.transform.scale(bulletSprite, (12, 12)), position, velocity, maxLife, light=light, name="bullet")
+        super().__init__(scaledBulletSprite, position, velocity, maxLife, light=light, name="bullet")
         self.collided = False
         self.damage = damage
         self.firer = firer
@@ -668,78 +1180,61 @@ class Bullet (Particle):
         # updating the bullet
         positionBefore = self.position[::]
         super().Update(events, dt)
-
-        # getting the dif in position
-        subSteps = 20
-        dif = [(self.position[0]-positionBefore[0]) / subSteps, (self.position[1]-positionBefore[1]) / subSteps]
-
-        # checking collision along mutliple steps (for more precision)
-        if self.firer != Friendlies.enemy:
-            for step in range(subSteps):
-                pos = [positionBefore[0] + dif[0]*step, positionBefore[1] + dif[1]*step]
-
-                gridPosition = tileMap.GetGridPosition(pos)  # checking for collision with amo crates and barrels
-                if tileMap.map[gridPosition[1]][gridPosition[0]] in [29, 22]:
-                    self.collided = True
-                    return  # ending the loop
-
-                for enemy in mobs:
-                    if enemy.CheckCollision(pos):
-                        self.collided = True
-                        enemy.health -= self.damage
-                        
-                        # adding knockback from being hit
-                        velocityLength = math.sqrt(self.velocity[0]**2 + self.velocity[1]**2)
-                        normalized = [self.velocity[0]/velocityLength, self.velocity[1]/velocityLength]
-                        enemy.velocity = [normalized[0] * self.knockback, normalized[1] * self.knockback]
-                        
-                        return  # ending the loops
-        if self.firer != Friendlies.friendly:
-            for step in range(subSteps):
-                pos = [positionBefore[0] + dif[0]*step, positionBefore[1] + dif[1]*step]
-
-                gridPosition = tileMap.GetGridPosition(pos)  # checking for collision with amo crates and barrels
-                if tileMap.map[gridPosition[1]][gridPosition[0]] in [29, 22]:
-                    self.collided = True
-                    return  # ending the loop
-
-                if player.CheckCollision(pos):
-                    self.collided = True
-                    player.Damage(self.damage)
-
-                    # adding knockback from being hit
-                    velocityLength = math.sqrt(self.velocity[0]**2 + self.velocity[1]**2)
-                    normalized = [self.velocity[0]/velocityLength, self.velocity[1]/velocityLength]
-                    player.velocity = [player.velocity[0] - normalized[0] * self.knockback, player.velocity[1] - normalized[1] * self.knockback]
-
-                    return  # ending the loops
+        delta = [self.position[0]-positionBefore[0], self.position[1]-positionBefore[1]]
+
+        # finding the first tile or solid object along the path (amo crates and barrels are hit anywhere in their tile)
+        hit = Raycast(positionBefore, self.position, breakableTiles)
+        hitTime = hit.fraction if hit else math.inf
+        objectHitTime = SegmentObjectHit(positionBefore, delta)
+        if objectHitTime is not None: hitTime = min(hitTime, objectHitTime)
+
+        # finding the first entity along the path that's hit before the tile
+        target = None
+        if self.firer == Friendlies.friendly:
+            pathBox = [min(positionBefore[0], self.position[0]), min(positionBefore[1], self.position[1]), abs(delta[0]), abs(delta[1])]
+            targets = mobBatch.Query(pathBox) if mobBatch else mobGrid.Query(pathBox)
+        else: targets = [player]
+        for entity in targets:
+            entityHitTime = SegmentBoxHit(positionBefore, delta, entity.GetBox())
+            if entityHitTime is not None and entityHitTime < hitTime:
+                hitTime, target = entityHitTime, entity
+        
+        if hitTime > 1: return  # nothing was hit
+        self.collided = True
+        self.position = [positionBefore[0] + delta[0]*hitTime, positionBefore[1] + delta[1]*hitTime]
+        
+        velocityLength = math.sqrt(self.velocity[0]**2 + self.velocity[1]**2)
+        normalized = [self.velocity[0]/velocityLength, self.velocity[1]/velocityLength]
+        if target is player:
+            player.Damage(self.damage)
+
+            # adding knockback from being hit
+            player.velocity = [player.velocity[0] - normalized[0] * self.knockback, player.velocity[1] - normalized[1] * self.knockback]
+        elif target:
+            # damaging the mob and adding knockback from being hit
+            target.Hit(self.damage, [normalized[0] * self.knockback, normalized[1] * self.knockback])
+        else:
+            # nudging the bullet into the tile so the right tile gets broken
+            self.position = [self.position[0] + normalized[0], self.position[1] + normalized[1]]
     
     # runs when the bullet hits something and is killed
     def Kill(self) -> None:
-        gridPosition = tileMap.GetGridPosition(self.position)
-        tile = tileMap.GetTileNumber(gridPosition)
-        if tile == 22:  # checking if the bullet hit a wooden barrel
-            # breaking the barrel
-            tileMap.map[gridPosition[1]][gridPosition[0]] = 30
-            tileMap.map[gridPosition[1]-1][gridPosition[0]] = 0
-
-            # dropping loot
-            DropLoot(woodenBarrelDrops, self.position)
-        elif tile == 29:  # checking for an amo crate
-            # opening the amo crate
-            tileMap.map[gridPosition[1]][gridPosition[0]] = 39
-
-            # dropping loot
-            DropLoot(amoCrateDrops, [gridPosition[0]*64+32, gridPosition[1]*64+88])
+        BreakTile(self.position)
 
 
 # a particle for when enimies die
 class SparksParticle (Particle):
+    __slots__ = ("value",)
+
     def __init__(self, position: list, velocity: list, maxLife: float, value: float=1) -> None:
         super().__init__(sparkSprite, position, velocity, maxLife, light=sparkLight, name="spark", collision=True)
         
         self.value = value
     
+    # wakes up in time to fly to the corner of the screen
+    def GetWakeTime(self) -> float:
+        return self.lifeTime + self.maxLife - 2
+
     # updating the particle
     def Update(self, events: Events.Manager, dt: float) -> None:
         # moving the particle
@@ -748,7 +1243,7 @@ class SparksParticle (Particle):
 
         # moving the particle to the corner of the screen when it's about to die
         screenPos = [self.position[0] - cameraPos[0] + zoomedScreenSize[0]//2, self.position[1] - cameraPos[1] + zoomedScreenSize[1]//2]
-        if self.maxLife - (time.time() - self.lifeTime) < 2:
+        if self.maxLife - (GetTime() - self.lifeTime) < 2:
             # checking if the particle is on screen and should be moved
             if screenPos[0] >= 0 and screenPos[0] <= zoomedScreenSize[0] and screenPos[1] >= 0 and screenPos[1] <= zoomedScreenSize[1]:
                 length = math.sqrt(screenPos[0]**2 + screenPos[1]**2)
@@ -763,8 +1258,771 @@ class SparksParticle (Particle):
                 player.lastDashed -= self.value * 0.25  # making the dash cooldown go quicker to reward quick flowier fighting hopefully to better allow that style of playing
                 player.health = min(player.health + self.value * 0.5, 100)
                 
-                healthText.text = f"{player.health}hp"
-                healthText.Update()
+                QueueText(healthText, f"{player.health}hp")
+        else: self.SettleIfSlow()  # resting until it's time to fly to the corner
+
+
+# =============================================================================
+#                               Line Of Sight
+#=============================================================================
+
+
+# checks if mobs can see the player, remembering the result for each pair of tiles for a little while so big waves don't each cast their own rays
+class LineOfSight:
+    def __init__(self, timeToLive: float=0.25) -> None:
+        self.timeToLive = timeToLive
+        self.cache = {}  # (start tile, end tile) -> (visible, time it was checked)
+        self.visible = {}  # entity -> if it could see the target on the last update
+        self.lastCleared = 0  # when the expired results were last cleared out
+
+    # gets the tile a position is in
+    def GetCell(self, position: tuple) -> tuple:
+        return (int(position[0]//tileMap.tileSize), int(position[1]//tileMap.tileSize))
+
+    # casts a ray through the tiles and solid objects to see if anything is in the way
+    def CastRay(self, start: tuple, end: tuple) -> bool:
+        if Raycast(start, end): return False
+        return SegmentObjectHit(start, (end[0] - start[0], end[1] - start[1])) is None
+
+    # checks the line of sight between two points (reusing a recent result for the same tiles)
+    def Check(self, start: tuple, end: tuple) -> bool:
+        currentTime = GetTime()
+        if currentTime - self.lastCleared >= self.timeToLive: self.ClearExpired(currentTime)  # (both the scalar and batched mobs check through here)
+
+        key = (self.GetCell(start), self.GetCell(end))
+        cached = self.cache.get(key)
+        if cached and currentTime - cached[1] < self.timeToLive: return cached[0]
+        
+        visible = self.CastRay(start, end)
+        self.cache[key] = (visible, currentTime)
+        return visible
+
+    # clears out the old results (done once every timeToLive so the cache only holds the recently seen tiles)
+    def ClearExpired(self, currentTime: float) -> None:
+        self.cache = {key: cached for key, cached in self.cache.items() if currentTime - cached[1] < self.timeToLive}
+        self.lastCleared = currentTime
+
+    # checks the line of sight for every armed mob in range of the target in one pass
+    def Update(self, entities: list, target: object) -> None:
+        self.visible = {}
+
+        for entity in entities:
+            if not entity.weapon: continue
+            travel = (target.position[0] - entity.position[0], target.position[1] - entity.position[1])
+            if travel[0]**2 + travel[1]**2 < entity.engagementDst:
+                self.visible[entity] = self.Check(entity.position, target.position)
+
+    # checks if an entity could see the target on the last update
+    def CanSee(self, entity: object) -> bool:
+        return self.visible.get(entity, False)
+
+    # forgets all the results (for when the tiles change)
+    def Invalidate(self) -> None:
+        self.cache = {}
+
+
+# =============================================================================
+#                               Pathfinding
+#=============================================================================
+
+
+# a distance field over the walkable tiles leading to the player (so every mob can find its way around walls without its own search)
+# moving the target changes the distance of nearly every tile (a repair from the old field ends up searching almost the whole map again),
+# so the field is rebuilt when the target moves, but only over the precomputed steps between tiles and the fields for the last few targets are kept to be reused
+class FlowField:
+    def __init__(self, maxFields: int=16) -> None:
+        self.targetCell = None
+        self.dirty = True
+        self.nextCells = {}  # tile -> the neighbouring tile that's one step closer to the target
+        self.distances = {}  # tile -> the distance to the target in tiles
+        self.neighbours = {}  # walkable tile -> the tiles that can be stepped to from it and what each step costs
+        self.targetArray = None  # the centers of the next tiles as an array (for the batched mobs)
+
+        # the fields for the most recent targets (the player walks back and forth over the same few tiles a lot)
+        self.maxFields = maxFields
+        self.fields = collections.OrderedDict()  # target tile -> (distances, next tiles, target array), ordered from least to most recently used
+        self.hits = 0
+        self.misses = 0
+        self.LoadObjects()
+
+    # finds the tiles the solid objects are in (called when the level is loaded or the objects change)
+    def LoadObjects(self) -> None:
+        self.objectCells = set()
+        tileSize = tileMap.tileSize
+        for obj in solidObjects:
+            for box in obj.worldHitBoxes:
+                for y in range(int(box[1]//tileSize), int((box[1]+box[3])//tileSize) + 1):
+                    for x in range(int(box[0]//tileSize), int((box[0]+box[2])//tileSize) + 1):
+                        self.objectCells.add((x, y))
+        self.dirty = True
+
+    # gets the tiles the solid objects are in as a mask over the map (for the batched bullets and mobs)
+    def GetObjectMask(self) -> "numpy.ndarray":
+        mask = numpy.zeros((len(collisionGrid), len(collisionGrid[0])), dtype=bool)
+        for x, y in self.objectCells:
+            if 0 <= y < mask.shape[0] and 0 <= x < mask.shape[1]: mask[y, x] = True
+        return mask
+
+    # checks if a mob can walk through a tile
+    def IsWalkable(self, cell: tuple) -> bool:
+        x, y = cell
+        if x < 0 or y < 0 or y >= len(collisionGrid) or x >= len(collisionGrid[y]): return False
+        return not collisionGrid[y][x] and cell not in self.objectCells
+
+    # gets the tiles that can be stepped to from a tile and the cost of each step (diagonal steps cost more)
+    def GetSteps(self, cell: tuple) -> list:
+        steps = []
+        for stepX, stepY in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+            neighbour = (cell[0] + stepX, cell[1] + stepY)
+            if not self.IsWalkable(neighbour): continue
+            if stepX and stepY and not (self.IsWalkable((cell[0] + stepX, cell[1])) and self.IsWalkable((cell[0], cell[1] + stepY))): continue  # not cutting corners
+            steps.append((neighbour, 1.4142 if stepX and stepY else 1))
+        return steps
+
+    # finds the steps out of every walkable tile (only redone when the tiles or objects change, not every time the target moves)
+    def BuildNeighbours(self) -> None:
+        self.neighbours = {}
+        for y in range(len(collisionGrid)):
+            for x in range(len(collisionGrid[y])):
+                if self.IsWalkable((x, y)): self.neighbours[(x, y)] = self.GetSteps((x, y))
+
+    # recomputes the distances from the target tile (dijkstra so diagonal steps cost more)
+    def Rebuild(self) -> None:
+        distances, nextCells, neighbours = {self.targetCell: 0}, {}, self.neighbours
+        queue = [(0, self.targetCell)]
+        while queue:
+            distance, cell = heapq.heappop(queue)
+            if distance > distances[cell]: continue  # already found a shorter path
+            
+            steps = neighbours.get(cell)
+            if steps is None: steps = self.GetSteps(cell)  # (the target can be in a tile that isn't walkable)
+            for neighbour, cost in steps:
+                newDistance = distance + cost
+                if newDistance < distances.get(neighbour, math.inf):
+                    distances[neighbour] = newDistance
+                    nextCells[neighbour] = cell
+                    heapq.heappush(queue, (newDistance, neighbour))
+        self.distances, self.nextCells = distances, nextCells
+        self.targetArray = None
+
+    # updates the field when the target moves to a new tile or the tiles change
+    def Update(self, targetPosition: tuple) -> None:
+        targetCell = (int(targetPosition[0]//tileMap.tileSize), int(targetPosition[1]//tileMap.tileSize))
+        if self.dirty:
+            # the steps between tiles changed so none of the old fields can be used
+            self.BuildNeighbours()
+            self.fields.clear()
+            self.dirty = False
+        elif targetCell == self.targetCell: return
+        else: self.fields[self.targetCell] = (self.distances, self.nextCells, self.targetArray)  # remembering the field being left (with its array if it was made)
+        
+        # reusing the new target's field if it's still around
+        self.targetCell = targetCell
+        field = self.fields.pop(targetCell, None)
+        if field:
+            self.hits += 1
+            self.distances, self.nextCells, self.targetArray = field
+        else:
+            self.misses += 1
+            self.Rebuild()
+        if len(self.fields) > self.maxFields: self.fields.popitem(last=False)
+
+    # gets the center of the next tile to walk to from a position (None if there's no path or it's already in the target's tile)
+    def GetTarget(self, position: tuple) -> list:
+        nextCell = self.nextCells.get((int(position[0]//tileMap.tileSize), int(position[1]//tileMap.tileSize)))
+        if nextCell is None: return None
+        return [(nextCell[0] + 0.5) * tileMap.tileSize, (nextCell[1] + 0.5) * tileMap.tileSize]
+
+    # gets the center of the next tile to walk to for every tile as an array (nan where there's no path)
+    def GetTargetArray(self) -> "numpy.ndarray":
+        if self.targetArray is None:
+            self.targetArray = numpy.full((len(collisionGrid), len(collisionGrid[0]), 2), numpy.nan)
+            if self.nextCells:
+                cells = numpy.array(list(self.nextCells.keys()), dtype=numpy.int64)
+                nextCells = numpy.array(list(self.nextCells.values()), dtype=float)
+                self.targetArray[cells[:, 1], cells[:, 0]] = (nextCells + 0.5) * tileMap.tileSize
+        return self.targetArray
+
+    # marks the field to be rebuilt (for when the tiles change)
+    def Invalidate(self) -> None:
+        self.dirty = True
+
+
+# =============================================================================
+#                               Batched Projectiles
+#=============================================================================
+
+
+# simulates all the bullets at once with numpy arrays (one row per bullet) instead of a Bullet object each
+class BulletSystem:
+    def __init__(self, capacity: int=256) -> None:
+        self.count = 0  # the number of live bullets (the first count rows of the arrays)
+        self.AllocateArrays(capacity)
+        self.sprite = scaledBulletSprite
+
+        # the tiles bullets could hit something in (only bullets that pass through them need an exact raycast)
+        self.blockingTiles = numpy.array([bool(hitBoxes) or tile in breakableTiles for tile, hitBoxes in enumerate(tileHitBoxLookup)])
+    
+    # creates the arrays for the bullets
+    def AllocateArrays(self, capacity: int) -> None:
+        self.positions = numpy.zeros((capacity, 2))
+        self.velocities = numpy.zeros((capacity, 2))
+        self.spawnTimes = numpy.zeros(capacity)
+        self.maxLives = numpy.zeros(capacity)
+        self.damages = numpy.zeros(capacity)
+        self.knockbacks = numpy.zeros(capacity)
+        self.firers = numpy.zeros(capacity, dtype=numpy.int8)  # the Friendlies value of whoever fired the bullet
+
+    # copies the current tile map into an array (called when a level is loaded)
+    def LoadMap(self) -> None:
+        self.tileArray = numpy.array(tileMap.map, dtype=numpy.int32)
+        self.LoadObjects()
+
+    # loads the tiles the collideable solid objects' hitboxes touch (called when the map is loaded or the objects change)
+    def LoadObjects(self) -> None:
+        self.objectMask = flowField.GetObjectMask()
+
+    # creates a new bullet
+    def Spawn(self, position: list, velocity: list, damage: float, maxLife: float, firer: Friendlies, knockback: float) -> None:
+        # growing the arrays when they're full
+        if self.count == len(self.positions):
+            oldArrays = [self.positions, self.velocities, self.spawnTimes, self.maxLives, self.damages, self.knockbacks, self.firers]
+            self.AllocateArrays(len(self.positions) * 2)
+            for old, new in zip(oldArrays, [self.positions, self.velocities, self.spawnTimes, self.maxLives, self.damages, self.knockbacks, self.firers]):
+                new[:self.count] = old[:self.count]
+
+        i = self.count
+        self.positions[i] = position
+        self.velocities[i] = velocity
+        self.spawnTimes[i] = GetTime()
+        self.maxLives[i] = maxLife
+        self.damages[i] = damage
+        self.knockbacks[i] = knockback
+        self.firers[i] = firer.value
+        self.count += 1
+
+    # finds the first time (0-1) each segment hits a box (inf if it doesn't hit any) and which box it hit
+    def SegmentBoxHits(self, starts: "numpy.ndarray", deltas: "numpy.ndarray", boxes: "numpy.ndarray") -> tuple:
+        infinity = numpy.inf
+        near, far = [], []
+        for axis in range(2):
+            start = starts[:, None, axis]
+            delta = deltas[:, None, axis]
+            boxMin, boxMax = boxes[None, :, axis], boxes[None, :, axis] + boxes[None, :, axis+2]
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                t1, t2 = (boxMin - start) / delta, (boxMax - start) / delta
+            
+            # segments that don't move along the axis either always or never overlap on it
+            still = delta == 0
+            inside = (start >= boxMin) & (start <= boxMax)
+            near.append(numpy.where(still, numpy.where(inside, -infinity, infinity), numpy.minimum(t1, t2)))
+            far.append(numpy.where(still, numpy.where(inside, infinity, -infinity), numpy.maximum(t1, t2)))
+        
+        enter, leave = numpy.maximum(near[0], near[1]), numpy.minimum(far[0], far[1])
+        hit = (enter <= leave) & (leave >= 0) & (enter <= 1)
+        times = numpy.where(hit, numpy.maximum(enter, 0), infinity)
+        closest = numpy.argmin(times, axis=1)
+        return times[numpy.arange(len(times)), closest], closest
+
+    # finds the first time (0-1) each segment hits a tile or solid object (inf if it doesn't hit any)
+    def SegmentTileHits(self, starts: "numpy.ndarray", deltas: "numpy.ndarray") -> "numpy.ndarray":
+        tileSize = tileMap.tileSize
+        height, width = self.tileArray.shape
+        ends = starts + deltas
+
+        # walking every segment through the grid together (a vectorized DDA) to find the ones that pass through a tile with something in it
+        cells = numpy.floor(starts / tileSize).astype(numpy.int64)
+        endCells = numpy.floor(ends / tileSize).astype(numpy.int64)
+        steps = numpy.where(deltas > 0, 1, -1)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            tDeltas = numpy.where(deltas != 0, tileSize / numpy.abs(deltas), numpy.inf)
+            tMaxes = numpy.where(deltas != 0, ((cells + (steps > 0)) * tileSize - starts) / deltas, numpy.inf)
+        
+        needsRaycast = numpy.zeros(len(starts), dtype=bool)
+        active = numpy.ones(len(starts), dtype=bool)
+        while active.any():
+            # checking the current cell of every segment that's still moving through the grid
+            cellX, cellY = cells[:, 0], cells[:, 1]
+            inside = (cellX >= 0) & (cellY >= 0) & (cellX < width) & (cellY < height)
+            clippedY, clippedX = numpy.clip(cellY, 0, height-1), numpy.clip(cellX, 0, width-1)
+            blocking = ~inside | self.blockingTiles[self.tileArray[clippedY, clippedX]] | self.objectMask[clippedY, clippedX]
+            needsRaycast |= active & blocking
+            active &= ~blocking & ((cells != endCells).any(axis=1))
+
+            # stepping to the next cell along whichever axis is crossed first
+            stepX = active & (tMaxes[:, 0] < tMaxes[:, 1])
+            stepY = active & ~stepX
+            cells[stepX, 0] += steps[stepX, 0]
+            tMaxes[stepX, 0] += tDeltas[stepX, 0]
+            cells[stepY, 1] += steps[stepY, 1]
+            tMaxes[stepY, 1] += tDeltas[stepY, 1]
+            with numpy.errstate(invalid="ignore"):  # (inf - inf for the axes a segment doesn't move along)
+                active &= numpy.where(stepX, tMaxes[:, 0] - tDeltas[:, 0], tMaxes[:, 1] - tDeltas[:, 1]) <= 1  # stopping at the end of the segment
+
+        # only the segments that pass through something get the exact raycast (against the tiles and the solid objects)
+        hitTimes = numpy.full(len(starts), numpy.inf)
+        for i in numpy.nonzero(needsRaycast)[0].tolist():
+            start = starts[i].tolist()
+            hit = Raycast(start, ends[i].tolist(), breakableTiles)
+            if hit: hitTimes[i] = hit.fraction
+            objectHitTime = SegmentObjectHit(start, deltas[i].tolist())
+            if objectHitTime is not None: hitTimes[i] = min(hitTimes[i], objectHitTime)
+        return hitTimes
+
+    # updates all the bullets
+    def Update(self, dt: float) -> None:
+        if not self.count: return
+        n = self.count
+        starts = self.positions[:n].copy()
+        deltas = self.velocities[:n] * dt
+        
+        # the first thing each bullet hits along its path this frame
+        hitTimes = self.SegmentTileHits(starts, deltas)
+        hitEntities = numpy.full(n, -1)  # the index of the target hit (-1 if a tile or nothing was hit)
+        
+        friendly = self.firers[:n] == Friendlies.friendly.value
+        targets = [mobs, [player]]
+        for shooters, entities in zip([friendly, ~friendly], targets):
+            if not entities or not shooters.any(): continue
+            if entities is mobs and mobBatch: boxes = mobBatch.GetBoxes()
+            else: boxes = numpy.array([entity.GetBox() for entity in entities], dtype=float)
+            times, closest = self.SegmentBoxHits(starts[shooters], deltas[shooters], boxes)
+            indexes = numpy.nonzero(shooters)[0]
+            closer = times < hitTimes[indexes]
+            hitTimes[indexes[closer]] = times[closer]
+            hitEntities[indexes[closer]] = closest[closer]
+        
+        # moving the bullets (stopping the ones that hit something where they hit it)
+        collided = hitTimes <= 1
+        self.positions[:n] = starts + deltas * numpy.where(collided, hitTimes, 1)[:, None]
+
+        # applying the damage and knockback, and breaking any crates or barrels that were hit
+        for i in numpy.nonzero(collided)[0].tolist():
+            velocity = self.velocities[i].tolist()
+            velocityLength = math.sqrt(velocity[0]**2 + velocity[1]**2)
+            normalized = [velocity[0]/velocityLength, velocity[1]/velocityLength]
+            damage, knockback = float(self.damages[i]), float(self.knockbacks[i])
+            if hitEntities[i] >= 0:
+                if friendly[i]:
+                    mobs[hitEntities[i]].Hit(damage, [normalized[0] * knockback, normalized[1] * knockback])
+                else:
+                    player.Damage(damage)
+                    player.velocity = [player.velocity[0] - normalized[0] * knockback, player.velocity[1] - normalized[1] * knockback]
+            else:
+                # nudging the position into the tile so the right tile gets broken
+                position = self.positions[i].tolist()
+                BreakTile([position[0] + normalized[0], position[1] + normalized[1]])
+        
+        # removing the dead bullets
+        alive = ~collided & (GetTime() - self.spawnTimes[:n] < self.maxLives[:n])
+        keep = numpy.nonzero(alive)[0]
+        self.count = len(keep)
+        for array in [self.positions, self.velocities, self.spawnTimes, self.maxLives, self.damages, self.knockbacks, self.firers]:
+            array[:self.count] = array[keep]
+
+    # renders the bullets' lights (only in dev mode, the same as the Bullet objects)
+    def RenderLighting(self, lightMap: pygame.Surface) -> None:
+        if not DEV_MODE: return
+        for position in self.positions[:self.count]:
+            bulletLight.Render(lightMap, [round(position[0]), round(position[1])])
+
+    # renders all the bullets on the screen
+    def Render(self, screen: pygame.Surface) -> None:
+        if not self.count: return
+        screenPositions = self.positions[:self.count] - [cameraPos[0] - zoomedScreenSize[0]//2 + 6, cameraPos[1] - zoomedScreenSize[1]//2 + 6]
+        onScreen = (screenPositions[:, 0] > -12) & (screenPositions[:, 1] > -12) & (screenPositions[:, 0] < zoomedScreenSize[0]) & (screenPositions[:, 1] < zoomedScreenSize[1])
+        screen.blits([(self.sprite, position) for position in numpy.round(screenPositions[onScreen]).tolist()], doreturn=False)
+
+
+# =============================================================================
+#                               Batched Mobs
+#=============================================================================
+
+
+# simulates all the mobs at once with numpy arrays (one row per mob, in the same order as the mobs list) that the batch owns
+# the steering, separation, movement away from walls, weapon cooldowns and the decision to fire are all done for every mob together,
+# and the Enemy objects are only touched for the mobs that are near something solid, fire, get hit or die (and for the ones on screen when rendering)
+class MobBatch:
+    def __init__(self, mobs: list, capacity: int=64) -> None:
+        self.mobs = mobs  # the Enemy for each row (kept in the same order as the arrays)
+        self.count = 0
+        self.AllocateArrays(capacity)
+        self.random = numpy.random.default_rng(random.getrandbits(32))  # seeded from random so headless runs stay deterministic
+
+        # the tiles mobs can't freely walk through
+        self.blockingTiles = numpy.array([bool(hitBoxes) for hitBoxes in tileHitBoxLookup])
+
+    # creates the arrays for the mobs
+    def AllocateArrays(self, capacity: int) -> None:
+        self.positions = numpy.zeros((capacity, 2))
+        self.velocities = numpy.zeros((capacity, 2))
+        self.healths = numpy.zeros(capacity)
+        self.lastFired = numpy.zeros(capacity)  # when each mob's weapon was last fired
+        self.fireRates = numpy.zeros(capacity)
+        self.engagementDsts = numpy.zeros(capacity)  # (squared)
+        self.armed = numpy.zeros(capacity, dtype=bool)
+        self.speeds = numpy.zeros(capacity)
+        self.shifts = numpy.zeros((capacity, 2))  # the hitbox shifts
+        self.hitBoxSizes = numpy.zeros((capacity, 2))
+        self.spriteSizes = numpy.zeros((capacity, 2))
+
+    # gets all the arrays (in the order they're copied when growing or removing)
+    def GetArrays(self) -> list:
+        return [self.positions, self.velocities, self.healths, self.lastFired, self.fireRates, self.engagementDsts, self.armed, self.speeds, self.shifts, self.hitBoxSizes, self.spriteSizes]
+
+    # loads the tiles from the current level (called when a level is loaded)
+    def LoadMap(self) -> None:
+        self.tileArray = numpy.array(tileMap.map, dtype=numpy.int64)
+        self.LoadObjects()
+
+    # loads which tiles have solid objects in them (called when the map is loaded or the objects change)
+    def LoadObjects(self) -> None:
+        self.objectMask = flowField.GetObjectMask()
+
+    # adds a mob (copying its state into the arrays, after this the arrays are what's up to date)
+    def Add(self, enemy: object) -> None:
+        # growing the arrays when they're full
+        if self.count == len(self.positions):
+            oldArrays = self.GetArrays()
+            self.AllocateArrays(len(self.positions) * 2)
+            for old, new in zip(oldArrays, self.GetArrays()):
+                new[:self.count] = old[:self.count]
+        
+        i = self.count
+        self.positions[i] = enemy.position
+        self.velocities[i] = enemy.velocity
+        self.healths[i] = enemy.health
+        self.armed[i] = bool(enemy.weapon)
+        if enemy.weapon:
+            self.lastFired[i] = enemy.weapon.lastFired
+            self.fireRates[i] = abs(enemy.weapon.fireRate)
+        self.engagementDsts[i] = enemy.engagementDst
+        self.speeds[i] = enemy.speed
+        self.shifts[i] = enemy.hitBoxShift
+        self.hitBoxSizes[i] = enemy.hitBoxSize
+        self.spriteSizes[i] = enemy.spriteSize
+        enemy.batchIndex = i
+        self.mobs.append(enemy)
+        self.count += 1
+
+    # copies a mob's position and velocity onto its Enemy (before running code on the object)
+    def WriteMob(self, i: int) -> object:
+        enemy = self.mobs[i]
+        enemy.position = self.positions[i].tolist()
+        enemy.velocity = self.velocities[i].tolist()
+        return enemy
+
+    # copies a mob's position and velocity back from its Enemy (after running code on the object)
+    def ReadMob(self, i: int) -> None:
+        enemy = self.mobs[i]
+        self.positions[i] = enemy.position
+        self.velocities[i] = enemy.velocity
+
+    # damages a mob and knocks it back
+    def Hit(self, i: int, damage: float, velocity: list) -> None:
+        self.healths[i] -= damage
+        self.velocities[i] = velocity
+
+    # removes the mobs that died by moving the last mobs into their rows, and returns them (with their final state written back)
+    def RemoveDead(self) -> list:
+        dead = numpy.nonzero(self.healths[:self.count] <= 0)[0].tolist()
+        deadEnemies = []
+        for i in reversed(dead):  # (from the back so the rows moved into the gaps are always alive)
+            enemy = self.WriteMob(i)
+            enemy.health = float(self.healths[i])
+            deadEnemies.append(enemy)
+
+            last = self.count - 1
+            for array in self.GetArrays():
+                array[i] = array[last]
+            self.mobs[i] = self.mobs[last]
+            self.mobs[i].batchIndex = i
+            self.mobs.pop()
+            self.count -= 1
+        return deadEnemies
+
+    # gets the boxes of the mobs' sprites as (x, y, width, height) (the same as Entity.GetBox)
+    def GetBoxes(self) -> "numpy.ndarray":
+        n = self.count
+        return numpy.concatenate((self.positions[:n] - self.spriteSizes[:n]//2, self.spriteSizes[:n]), axis=1)
+
+    # gets the mobs whose boxes overlap a box [x, y, width, height] (with their positions written back)
+    def Query(self, box: list) -> list:
+        boxes = self.GetBoxes()
+        overlapping = (boxes[:, 0] <= box[0] + box[2]) & (boxes[:, 0] + boxes[:, 2] >= box[0]) & (boxes[:, 1] <= box[1] + box[3]) & (boxes[:, 1] + boxes[:, 3] >= box[1])
+        return [self.WriteMob(i) for i in numpy.nonzero(overlapping)[0].tolist()]
+
+    # checks which boxes (x, y, x2, y2 in tiles) are touching any blocked tile (boxes are at most 2 tiles across)
+    def TouchesBlocked(self, cellBoxes: "numpy.ndarray") -> "numpy.ndarray":
+        height, width = self.tileArray.shape
+        touching = ((cellBoxes[:, 2] - cellBoxes[:, 0]) > 1) | ((cellBoxes[:, 3] - cellBoxes[:, 1]) > 1)  # too big to check the corners
+        touching |= (cellBoxes[:, 0] < 0) | (cellBoxes[:, 1] < 0) | (cellBoxes[:, 2] >= width) | (cellBoxes[:, 3] >= height)
+        for x, y in ((0, 1), (2, 1), (0, 3), (2, 3)):
+            cellX, cellY = numpy.clip(cellBoxes[:, x], 0, width-1), numpy.clip(cellBoxes[:, y], 0, height-1)
+            touching |= self.blockingTiles[self.tileArray[cellY, cellX]] | self.objectMask[cellY, cellX]
+        return touching
+
+    # finds how much each mob is pushed away from the mobs near it (the same as Enemy.GetSeparation for every mob at once)
+    def GetSeparation(self, positions: "numpy.ndarray") -> "numpy.ndarray":
+        count = len(positions)
+        separation = numpy.zeros((count, 2))
+        if count < 2: return separation
+
+        # sorting along x so each mob only has to be paired with the ones just after it
+        order = numpy.argsort(positions[:, 0], kind="stable")
+        sortedX = positions[order, 0]
+        pairCounts = numpy.searchsorted(sortedX, sortedX + Enemy.separationRadius, side="right") - numpy.arange(count) - 1
+        total = int(pairCounts.sum())
+        if not total: return separation
+        
+        firsts = numpy.repeat(numpy.arange(count), pairCounts)
+        seconds = firsts + 1 + numpy.arange(total) - numpy.repeat(numpy.cumsum(pairCounts) - pairCounts, pairCounts)
+        firsts, seconds = order[firsts], order[seconds]
+
+        # pushing each pair apart more the closer they are
+        offsets = positions[firsts] - positions[seconds]
+        distances = numpy.sqrt((offsets**2).sum(axis=1))
+        pushes = numpy.clip(1 - distances / Enemy.separationRadius, 0, None) / numpy.maximum(distances, 1)
+        for axis in range(2):
+            weights = offsets[:, axis] * pushes
+            separation[:, axis] = numpy.bincount(firsts, weights, count) - numpy.bincount(seconds, weights, count)
+        return separation
+
+    # moves the mobs, only running the full collision on the ones that might touch something solid
+    def Move(self, events: Events.Manager, dt: float) -> None:
+        n = self.count
+        positions, velocities = self.positions[:n], self.velocities[:n]
+        deltas = velocities * dt
+        boxStarts = positions + self.shifts[:n] - self.hitBoxSizes[:n]//2
+        boxEnds = boxStarts + self.hitBoxSizes[:n]
+        cellBoxes = numpy.floor(numpy.concatenate((numpy.minimum(boxStarts, boxStarts + deltas), numpy.maximum(boxEnds, boxEnds + deltas)), axis=1) / tileMap.tileSize).astype(numpy.int64)
+        needsCollision = self.TouchesBlocked(cellBoxes)
+        positions[~needsCollision] += deltas[~needsCollision]
+
+        for i in numpy.nonzero(needsCollision)[0].tolist():
+            Entity.Update(self.WriteMob(i), events, dt)
+            self.ReadMob(i)
+
+    # counts down the weapon cooldowns and fires the weapons of the mobs that decide to (only those need line of sight)
+    def UpdateWeapons(self, dt: float) -> None:
+        n = self.count
+        now = GetTime()
+        travels = numpy.array(player.position, dtype=float) - self.positions[:n]
+        inRange = self.armed[:n] & ((travels**2).sum(axis=1) < self.engagementDsts[:n])
+
+        # resetting the cooldown of the mobs out of range so they don't instantly shoot upon seeing the player
+        outOfRange = self.armed[:n] & ~inRange
+        self.lastFired[:n][outOfRange] = now - numpy.maximum(self.fireRates[:n][outOfRange] - 0.25, 0.1)
+
+        # the same checks as Enemy.UpdateWeapon (cooled down and a random roll so they don't all fire together), with line of sight checked last
+        firing = inRange & (now - self.lastFired[:n] > self.fireRates[:n]) & (self.random.random(n) < dt)
+        for i in numpy.nonzero(firing)[0].tolist():
+            enemy = self.WriteMob(i)
+            if not lineOfSight.Check(enemy.position, player.position): continue
+            worldEntities.Extend(enemy.weapon.ForceFire(travels[i].tolist(), enemy))
+            enemy.weapon.lastFired = now
+            self.lastFired[i] = now
+            self.ReadMob(i)  # (the weapon's knockback changes the velocity)
+
+    # steers the mobs along the flow field (or straight at the player once in the same tile or if there's no path) while pushing them apart
+    def Steer(self) -> None:
+        n = self.count
+        positions = self.positions[:n]
+        feetPositions = positions + self.shifts[:n]
+        targetArray = flowField.GetTargetArray()
+        height, width = targetArray.shape[:2]
+        cells = numpy.floor(feetPositions / tileMap.tileSize).astype(numpy.int64)
+        inside = (cells[:, 0] >= 0) & (cells[:, 1] >= 0) & (cells[:, 0] < width) & (cells[:, 1] < height)
+        targets = targetArray[numpy.clip(cells[:, 1], 0, height-1), numpy.clip(cells[:, 0], 0, width-1)]
+        hasTarget = inside & ~numpy.isnan(targets[:, 0])
+        difs = numpy.where(hasTarget[:, None], targets - feetPositions, numpy.array(player.position, dtype=float) - positions)
+        lengths = numpy.sqrt((difs**2).sum(axis=1))
+        lengths[lengths == 0] = 1
+        directions = difs / lengths[:, None] + self.GetSeparation(positions) * Enemy.separationStrength
+        self.velocities[:n] = self.velocities[:n]*0.8 + directions * self.speeds[:n, None] * 0.2
+
+    # updates all the mobs
+    def Update(self, events: Events.Manager, dt: float) -> None:
+        if not self.count: return
+        self.Move(events, dt)
+        self.UpdateWeapons(dt)
+        self.Steer()
+
+    # writes back what rendering needs (the position, and the velocity for the facing) and steps the animations of the mobs near the screen
+    # returns those mobs (the others can't be seen, and the margin keeps the ones whose muzzle flash could reach the screen)
+    def GetVisible(self, events: Events.Manager, dt: float, margin: float=400) -> list:
+        n = self.count
+        screenBox = numpy.array([cameraPos[0] - zoomedScreenSize[0]//2 - margin, cameraPos[1] - zoomedScreenSize[1]//2 - margin, cameraPos[0] + zoomedScreenSize[0]//2 + margin, cameraPos[1] + zoomedScreenSize[1]//2 + margin])
+        positions = self.positions[:n]
+        visible = (positions[:, 0] > screenBox[0]) & (positions[:, 1] > screenBox[1]) & (positions[:, 0] < screenBox[2]) & (positions[:, 1] < screenBox[3])
+        
+        visibleMobs = []
+        for i in numpy.nonzero(visible)[0].tolist():
+            enemy = self.WriteMob(i)
+            enemy.enemyAnimation.Update(events, dt)
+            visibleMobs.append(enemy)
+        return visibleMobs
+
+
+# =============================================================================
+#                               World Entities
+#=============================================================================
+
+
+# a dense list of one kind of entity where removing is O(1) (the last item is swapped into the gap so the order isn't kept)
+class EntityList:
+    def __init__(self) -> None:
+        self.items = []
+        self.resting = []  # entities that came to a stop (skipped until they're due to wake or something wakes them)
+
+    def __len__(self) -> int:
+        return len(self.items) + len(self.resting)
+
+    def __iter__(self) -> iter:
+        return itertools.chain(self.items, self.resting)
+
+    # adds an entity
+    def Add(self, entity: object) -> None:
+        self.items.append(entity)
+
+    # removes the entity at an index (of the updating or resting entities) by moving the last entity into its place
+    def Remove(self, index: int, resting: bool=False) -> object:
+        items = self.resting if resting else self.items
+        entity = items[index]
+        last = items.pop()
+        if index < len(items): items[index] = last
+        return entity
+
+    # moves a resting entity back into the updating ones
+    def Wake(self, index: int) -> None:
+        entity = self.Remove(index, resting=True)
+        entity.resting = False
+        self.items.append(entity)
+
+    # wakes every resting entity inside of a box (or all of them if no box is given)
+    def WakeArea(self, box: list=None) -> None:
+        resting = self.resting
+        i = 0
+        while i < len(resting):
+            position = resting[i].position
+            if box is None or (box[0] <= position[0] <= box[0]+box[2] and box[1] <= position[1] <= box[1]+box[3]): self.Wake(i)
+            else: i += 1
+
+    # updates every entity and removes the ones that died (killing them and giving them back to their pool)
+    def Update(self, events: Events.Manager, dt: float, isAlive: callable) -> None:
+        # waking the resting entities that are due (they get updated and culled along with everything else)
+        resting = self.resting
+        now = GetTime()
+        i = 0
+        while i < len(resting):
+            if now >= resting[i].wakeTime: self.Wake(i)
+            else: i += 1
+
+        items = self.items
+        i = 0
+        while i < len(items):
+            entity = items[i]
+            entity.Update(events, dt)
+            if isAlive(entity):
+                if entity.resting: resting.append(self.Remove(i))  # moving it out of the update (the last entity was swapped into this spot)
+                else: i += 1
+                continue
+            
+            # not moving on since the last entity was swapped into this spot and still needs updating
+            self.Remove(i)
+            entity.Kill()
+            ReleaseParticle(entity)  # nothing else holds onto dead particles so they can be reused
+
+
+# all the short lived things in the world (bullets, sparks and dropped items), each kind is stored and culled on its own
+class WorldEntities:
+    def __init__(self) -> None:
+        self.bullets = EntityList()
+        self.sparks = EntityList()
+        self.drops = EntityList()
+        self.kinds = {Bullet: self.bullets, SparksParticle: self.sparks, DroppedItem: self.drops}
+
+    def __len__(self) -> int:
+        return len(self.bullets) + len(self.sparks) + len(self.drops)
+
+    # adds an entity to the list for its kind
+    def Add(self, entity: Particle) -> None:
+        self.kinds[type(entity)].Add(entity)
+
+    # adds a list of entities
+    def Extend(self, entities: list) -> None:
+        for entity in entities: self.Add(entity)
+
+    # checks if a position is inside a solid tile or object
+    def IsInsideSolid(self, position: tuple) -> bool:
+        for obj in objectGrid.Query([position[0], position[1], 0, 0]):
+            if obj.CheckCollision(position): return True
+        return TileMapCollision(position)
+
+    # checks if each kind is still alive
+    def IsBulletAlive(self, bullet: Bullet) -> bool:
+        return GetTime() - bullet.lifeTime < bullet.maxLife and not bullet.collided and not self.IsInsideSolid(bullet.position)
+
+    def IsSparkAlive(self, spark: SparksParticle) -> bool:
+        return GetTime() - spark.lifeTime < spark.maxLife and not (spark.collision and self.IsInsideSolid(spark.position))  # sparks phase through walls when flying to the corner
+
+    def IsDropAlive(self, drop: DroppedItem) -> bool:
+        return GetTime() - drop.lifeTime < drop.maxLife and not self.IsInsideSolid(drop.position)
+
+    # wakes the resting sparks and drops inside of a box (or all of them) so they update and get their collision checked again
+    def Wake(self, box: list=None) -> None:
+        self.sparks.WakeArea(box)
+        self.drops.WakeArea(box)
+
+    # picks up every drop touching the player in one pass, merging them so each inventory slot and the hud only update once
+    def CollectDrops(self) -> None:
+        if not len(self.drops): return
+
+        # the players box
+        left = player.position[0] - player.spriteSize[0]//2
+        top = player.position[1] - player.spriteSize[1]//2
+        right, bottom = left + player.spriteSize[0], top + player.spriteSize[1]
+
+        pickups = {}  # (drop type, name) -> total amount
+        for resting, items in ((False, self.drops.items), (True, self.drops.resting)):  # resting drops can still be picked up
+            i = 0
+            while i < len(items):
+                drop = items[i]
+                if not (left <= drop.position[0] <= right and top <= drop.position[1] <= bottom):
+                    i += 1
+                    continue
+                
+                key = (drop.dropType, drop.dropName)
+                pickups[key] = pickups.get(key, 0) + drop.amount
+                self.drops.Remove(i, resting)
+                drop.Kill()
+                ReleaseParticle(drop)
+        
+        # giving the items to the player
+        for (dropType, dropName), amount in pickups.items():
+            player.AddLoot(dropType, dropName, amount)
+
+    # updates everything
+    def Update(self, events: Events.Manager, dt: float) -> None:
+        self.bullets.Update(events, dt, self.IsBulletAlive)
+        self.sparks.Update(events, dt, self.IsSparkAlive)
+        self.drops.Update(events, dt, self.IsDropAlive)
+        self.CollectDrops()
+        if bulletSystem: bulletSystem.Update(dt)
+
+    # renders all the lights
+    def RenderLighting(self, lightMap: pygame.Surface) -> None:
+        for entities in (self.drops, self.sparks, self.bullets):
+            for entity in entities:
+                entity.RenderLighting(lightMap)
+        if bulletSystem: bulletSystem.RenderLighting(lightMap)
+
+    # renders everything
+    def Render(self, screen: pygame.Surface) -> None:
+        for entities in (self.drops, self.sparks, self.bullets):
+            for entity in entities:
+                entity.Render(screen)
+        if bulletSystem: bulletSystem.Render(screen)
 
 
 # =============================================================================
@@ -810,7 +2068,7 @@ class ItemSlot:
         pygame.draw.rect(self.surface, color, [2, 2, 52, 52], 0, 0)
         pygame.draw.rect(self.surface, uiColorPallete.brightColor, [0, 0, 56, 56], 2, 2)
         self.surface.blit(self.sprite, [4, 4])
-        UI.DrawText(self.surface, 15, "pixel2.ttf", f"{self.amount}", (5, 37), uiColorPallete.textColor)
+        textCache.DrawText(self.surface, 15, "pixel2.ttf", f"{self.amount}", (5, 37), uiColorPallete.textColor)
     
     # renders the surface
     def Render(self, screen: pygame.Surface, position: tuple) -> None:
@@ -846,7 +2104,7 @@ class CraftingRecipe:
         pygame.draw.rect(self.surface, uiColorPallete.color, [2, 2, 52, 52], 0, 0)
         pygame.draw.rect(self.surface, uiColorPallete.brightColor, [0, 0, 56, 56], 2, 2)
         self.surface.blit(self.sprite, [4, 4])
-        UI.DrawText(self.surface, 15, "pixel2.ttf", f"{self.amount}", (5, 37), uiColorPallete.textColor)
+        textCache.DrawText(self.surface, 15, "pixel2.ttf", f"{self.amount}", (5, 37), uiColorPallete.textColor)
 
     # checks for ingredients
     def CheckIngredients(self, player: object) -> bool:
@@ -873,6 +2131,93 @@ class CraftingRecipe:
             #player.armorInventory.append(playerArmors[self.outputName])
 
 
+# bakes the inventory and crafting panels into a single surface (only rebuilt when the inventory or selection changes)
+class InventoryPanel:
+    cellSize = 24*2 + 2+2 + 2+2 + 5  # 56 i think
+    recipeCells = 4
+
+    def __init__(self) -> None:
+        self.surface = None
+        self.bounds = pygame.Rect(0, 0, 0, 0)  # the area of the surface that actually has something on it
+        self.layout = []  # [rect, slot or recipe index] for hit testing
+        self.dirty = True
+        self.signature = None  # the settings the current bake was made with
+        self.validRecipe = False  # cashed result of checking the selected recipes ingredients
+        self.builds = 0
+
+    # marks the panel to be re-baked on the next use
+    def Invalidate(self) -> None:
+        self.dirty = True
+
+    # gets the layout settings that the bake depends on
+    def GetSignature(self, player: object) -> tuple:
+        return (screenSize, player.leftPadding, player.rightPadding, bool(player.inCraftingBenchT1), player.selectedRecipe)
+
+    # rebuilds the layout and surface if anything changed
+    def Refresh(self, player: object) -> None:
+        signature = self.GetSignature(player)
+        if not self.dirty and signature == self.signature: return
+        self.dirty = False
+        self.signature = signature
+        self.builds += 1
+
+        if self.surface is None or self.surface.get_size() != screenSize:
+            self.surface = pygame.Surface(screenSize).convert()
+            self.surface.set_colorkey((1, 1, 1), pygame.RLEACCEL)
+        self.surface.fill((1, 1, 1))
+        self.layout = []
+        areas = []
+
+        # laying out the inventory slots
+        cellSize = self.cellSize
+        width = screenSize[0] - 120 - player.leftPadding - player.rightPadding  # 60 padding on each side
+        cells = max(width // cellSize, 1)
+        player.RefreshSlots()  # re-rendering any slots whose amount changed since the last bake
+        for i, slot in enumerate(list(player.inventorySlots.values())+player.armorInventory):
+            x = (i%cells) * cellSize + 60 + player.leftPadding
+            y = (i//cells) * cellSize + 60
+            slot.Render(self.surface, [x, y])
+            self.layout.append([pygame.Rect(x, y, 56, 56), slot])
+            areas.append(self.layout[-1][0])
+
+        # laying out the crafting menu
+        self.validRecipe = False
+        if player.inCraftingBenchT1:
+            offset = (265 - self.recipeCells*cellSize)*0.5
+            for i, recipe in enumerate(craftingRecipesTier1):
+                x = (i%self.recipeCells) * cellSize + 60 + offset
+                y = (i//self.recipeCells) * cellSize + 60+250
+                self.surface.blit(recipe.surface, (x, y))
+                self.layout.append([pygame.Rect(x, y, 56, 56), i])
+                areas.append(self.layout[-1][0])
+
+            # rendering the recipe window
+            pygame.draw.rect(self.surface, uiColorPallete.color, [62, 62, 261, 211])
+            pygame.draw.rect(self.surface, uiColorPallete.brightColor, [60, 60, 265, 215], 2, 4)  # 25 less padding on inventory side than screen edge
+            areas.append(pygame.Rect(60, 60, 265, 215))
+
+            # rendering the selected recipe
+            if player.selectedRecipe >= 0:
+                self.surface.blit(player.craftIngredientCash, (65, 65))
+                self.validRecipe = craftingRecipesTier1[player.selectedRecipe].CheckIngredients(player)
+
+        self.bounds = areas[0].unionall(areas[1:]) if areas else pygame.Rect(0, 0, 0, 0)
+
+    # finds the slot or recipe index under a point
+    def HitTest(self, player: object, position: tuple) -> any:
+        self.Refresh(player)
+        for rect, item in self.layout:
+            # matching the old exclusive edge checks
+            relativePos = [position[0] - rect.x, position[1] - rect.y]
+            if 0 < relativePos[0] < rect.w and 0 < relativePos[1] < rect.h: return item
+        return None
+
+    # renders the baked panel
+    def Render(self, screen: pygame.Surface, player: object) -> None:
+        self.Refresh(player)
+        if self.bounds.w: screen.blit(self.surface, self.bounds.topleft, self.bounds)
+
+
 # the player entity
 class Player (Entity):
     def __init__(self, sprites: pygame.Surface, light: object) -> None:
@@ -904,9 +2249,6 @@ class Player (Entity):
         self.health = 100
         self.lastDamaged = 0
 
-        # the projectiles the player has shot
-        self.projectiles = []
-        self.deadProjectiles = []
 
         self.exp = 0
 
@@ -921,7 +2263,9 @@ class Player (Entity):
 
         # all the armor the player has in their inventory
         self.armorInventory = []
+        self.armorSlots = {}  # armor name -> index in the armor inventory
         self.selectedArmor = -1
+        self.equippedArmor = None  # the armor of the selected slot (so damage doesn't have to look it up)
 
         # all the parts the player has
         self.partInventory = {
@@ -940,7 +2284,9 @@ class Player (Entity):
             "Fire Powder": 0,
             "Spring": 0
         }
-        self.inventorySlots = []  # for all the cashed slots (cashed for preformance)
+        self.inventorySlots = {}  # part name -> cashed slot (cashed for preformance, dicts keep the insertion order for the layout)
+        self.staleSlots = set()  # slots whose amount changed but haven't been re-rendered yet
+        self.inventoryPanel = InventoryPanel()  # the baked inventory and crafting panels
         self.openInventory = False
         self.selectedRecipe = -1  # the recipe currently selected
 
@@ -955,84 +2301,73 @@ class Player (Entity):
     # adds a new piece of armor to the players inventory
     def AddArmor(self, name: str) -> None:
         # finding if the player already has it in their inventory
-        for armor in self.armorInventory:
-            if armor.name == name:
-                armor.UpdateCash(armor.amount + 1)
-                return  # ending early so it doesn't dupe a new copy
+        if name in self.armorSlots:
+            armor = self.armorInventory[self.armorSlots[name]]
+            armor.amount += 1
+            self.staleSlots.add(armor)
+            self.inventoryPanel.Invalidate()
+            return  # ending early so it doesn't dupe a new copy
         
+        self.armorSlots[name] = len(self.armorInventory)
         self.armorInventory.append(ItemSlot(playerArmors[name].itemSprite, name, DropTypes.Armor, 1))  # adding a new item for it
+        self.inventoryPanel.Invalidate()
 
     # adds a new part
     def AddPart(self, partName: str, amount: int) -> None:
-        if self.partInventory[partName]:  # adding to an already existing part
+        slot = self.inventorySlots.get(partName)
+        if slot:  # adding to an already existing part
             self.partInventory[partName] += amount
-            for slot in self.inventorySlots:
-                if slot.name == partName: slot.UpdateCash(self.partInventory[partName])
+            slot.amount = self.partInventory[partName]
+            self.staleSlots.add(slot)
         else:  # adding a new slot for a new item
             self.partInventory[partName] = amount
-            self.inventorySlots.append(ItemSlot(partDropSpritesDoubleScale[partNames.index(partName)], partName, DropTypes.Part, amount))
+            self.inventorySlots[partName] = ItemSlot(partDropSpritesDoubleScale[partIndices[partName]], partName, DropTypes.Part, amount)
+        self.inventoryPanel.Invalidate()
     
     # removes a part
     def RemovePart(self, partName: str, amount: int) -> None:
         self.partInventory[partName] -= amount
+        slot = self.inventorySlots[partName]
         if self.partInventory[partName]:  # updating the cash
-            for slot in self.inventorySlots:
-                if slot.name == partName: slot.UpdateCash(self.partInventory[partName])
+            slot.amount = self.partInventory[partName]
+            self.staleSlots.add(slot)
         else:  # removing the slot as nothing is left
-            valid = []
-            for slot in self.inventorySlots:
-                if slot.name != partName: valid.append(slot)
-            self.inventorySlots = valid
+            del self.inventorySlots[partName]
+            self.staleSlots.discard(slot)
+        self.inventoryPanel.Invalidate()
+
+    # adds picked up loot to the inventory
+    def AddLoot(self, dropType: DropTypes, dropName: any, amount: int) -> None:
+        if dropType == DropTypes.Amo:
+            self.amoInventory[dropName] += amount
+            QueueText(amoText, f"{self.weaponInventory[self.weaponSlot].capacityLeft} - {self.amoInventory[self.weaponInventory[self.weaponSlot].amoType]}")
+        elif dropType == DropTypes.Part:
+            self.AddPart(dropName, amount)
+        elif dropType == DropTypes.Weapon:
+            for i in range(amount): self.weaponInventory.append(playerWeapons[dropName].Copy())
+        elif dropType == DropTypes.Armor:
+            for i in range(amount): self.AddArmor(dropName)
+
+    # re-renders the slots that changed (batched so a burst of pickups or crafting only re-renders each slot once)
+    def RefreshSlots(self) -> None:
+        for slot in self.staleSlots:
+            slot.UpdateCash(slot.amount)
+        self.staleSlots.clear()
 
     # renders the ui (mainly the inventory)
     def RenderUI(self, screen: pygame.Surface) -> None:
         if self.openInventory:
-            # cell is 24x24 2 padding each side, 2 wide boarder, 5 separation
-            width = screenSize[0] - 120 - self.leftPadding - self.rightPadding  # 60 padding on each side
-            cellSize = 24*2 + 2+2 + 2+2 + 5  # 56 i think
-            cells = width // cellSize
+            # rendering the baked inventory and crafting panels
+            self.inventoryPanel.Render(screen, self)
 
-            # rendering the inventory
-            i = 0
-            for slot in self.inventorySlots+self.armorInventory:
-                x = (i%cells) * cellSize + 60 + self.leftPadding
-                y = (i//cells) * cellSize + 60
-                slot.Render(screen, [x, y])
-                i += 1
-            
-            # rendering the crafting menu
             if self.inCraftingBenchT1:
-                i = 0
-                numCells = 4#265//cellSize#240 // cellSize
-                offset = (265 - numCells*cellSize)*0.5
-                for recipe in craftingRecipesTier1:
-                    # rendering the item slot
-                    x = (i%numCells) * cellSize + 60 + offset
-                    y = (i//numCells) * cellSize + 60+250
-                    screen.blit(recipe.surface, (x, y))
-                    i += 1
-                
-                # rendering the recipe window
-                pygame.draw.rect(screen, uiColorPallete.color, [62, 62, 261, 211])
-                pygame.draw.rect(screen, uiColorPallete.brightColor, [60, 60, 265, 215], 2, 4)  # 25 less padding on inventory side than screen edge
-
                 # rendering the selected recipe
                 if self.selectedRecipe >= 0:
-                    # drawing the ingredients
-                    i = 0
-
-                    screen.blit(self.craftIngredientCash, (65, 65))
-                    # cash this render
-                    #for ingredient, amount in craftingRecipesTier1[self.selectedRecipe].ingredients:
-                    #    UI.DrawText(screen, 20, "pixel2.ttf", f"{amount}x {ingredient}", (65, 65 + i*25), uiColorPallete.textColor)
-                    #    i += 1
-                    
                     # rendering the craft button
                     self.craftButton.Render(screen, events)  # idk how to move the update sequence to another section because of how it was made and also I don't want to be redundently checking the able to craft the recipe
                     
                     # checking if the player is trying to craft
-                    validRecipe = craftingRecipesTier1[self.selectedRecipe].CheckIngredients(self)
-                    if not validRecipe:
+                    if not self.inventoryPanel.validRecipe:
                         if self.craftButton.state not in [UI.Button.States.held, UI.Button.States.realeased]:
                             # resetting the cashed render
                             self.craftButton.state = UI.Button.States.held
@@ -1062,24 +2397,23 @@ class Player (Entity):
     def Damage(self, damage: int) -> None:
         # checking for armor
         finalDamage = damage
-        if self.selectedArmor != -1:  # checking if the player is wearing armor
-            finalDamage = round(playerArmors[self.armorInventory[self.selectedArmor].name].ReduceDamage(damage), 0)
+        if self.equippedArmor:  # checking if the player is wearing armor
+            finalDamage = round(self.equippedArmor.ReduceDamage(damage), 0)
         
         # damaging the player
         self.health = max(self.health - finalDamage, 0)
         if self.health <= 0:
             pass  # kill the player
         
-        healthText.text = f"{self.health}hp"
-        healthText.Update()
+        QueueText(healthText, f"{self.health}hp")
     
     # updating the player
     def Update(self, events: Events.Manager, dt: float) -> None:
         # dashing
-        timeSinceDash = time.time() - self.lastDashed
+        timeSinceDash = GetTime() - self.lastDashed
         if pygame.K_SPACE in events.events and timeSinceDash > self.stats["dashCooldown"]:
             self.dash = self.stats["dashSpeed"]
-            self.lastDashed = time.time()
+            self.lastDashed = GetTime()
         elif timeSinceDash > 0.2:
             self.dash = Mix(self.dash, 1, dt*5)
         
@@ -1109,10 +2443,8 @@ class Player (Entity):
             if str(i) in events.typed:
                 if i <= len(self.weaponInventory):
                     self.weaponSlot = i - 1
-                    weaponNameText.text = self.weaponInventory[self.weaponSlot].name
-                    weaponNameText.Update()
-                    amoText.text = f"{player.weaponInventory[player.weaponSlot].capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}"
-                    amoText.Update()
+                    QueueText(weaponNameText, self.weaponInventory[self.weaponSlot].name)
+                    QueueText(amoText, f"{player.weaponInventory[player.weaponSlot].capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}")
 
                 break
         
@@ -1132,30 +2464,20 @@ class Player (Entity):
 
             # checking if the player has selected a recipe
             if events.mouseStates["left"] == Events.MouseStates.pressed:
-                i = 0
-                cellSize = 24*2 + 2+2 + 2+2 + 5  # 56 i think
-                numCells = 4#265//cellSize#240 // cellSize
-                offset = (265 - numCells*cellSize)*0.5
-                for recipe in craftingRecipesTier1:
-                    x = (i%numCells) * cellSize + 60 + offset
-                    y = (i//numCells) * cellSize + 60+250
-                    screen.blit(recipe.surface, (x, y))
-                    if recipe.CheckCollision((x, y), events.mousePos):
-                        # selecting the recipe
-                        self.selectedRecipe = i
-                        
-                        # creating the new cash
-                        j = 0
-                        #self.craftIngredientCash = pygame.Surface((265, 215))
-                        self.craftIngredientCash.fill((0, 0, 0))
-                        #self.craftIngredientCash.set_colorkey((0, 0, 0))
-                        for ingredient, amount in craftingRecipesTier1[self.selectedRecipe].ingredients:
-                            UI.DrawText(self.craftIngredientCash, 20, "pixel2.ttf", f"{amount}x {ingredient}", (0, j*25), uiColorPallete.textColor)
-                            j += 1
-
-                        validToFire = False  # the player shouldn't shoot when messing with the menu
-                        break
-                    i += 1
+                recipe = self.inventoryPanel.HitTest(self, events.mousePos)
+                if type(recipe) == int:
+                    # selecting the recipe
+                    self.selectedRecipe = recipe
+                    
+                    # creating the new cash
+                    j = 0
+                    self.craftIngredientCash.fill((0, 0, 0))
+                    for ingredient, amount in craftingRecipesTier1[self.selectedRecipe].ingredients:
+                        textCache.DrawText(self.craftIngredientCash, 20, "pixel2.ttf", f"{amount}x {ingredient}", (0, j*25), uiColorPallete.textColor)
+                        j += 1
+                    self.inventoryPanel.Invalidate()
+
+                    validToFire = False  # the player shouldn't shoot when messing with the menu
                 
                 # checking if the player was clicking the crafting window (to stop the gun from firing)
                 if (events.mousePos[0] > 60 and events.mousePos[0] < 325) and (events.mousePos[1] > 60 and events.mousePos[1] < 275): validToFire = False
@@ -1165,36 +2487,27 @@ class Player (Entity):
         # checking if the player click on a cell in the inventory to stop it from firing and also to interact with it
         if self.openInventory:
             if events.mouseStates["left"] == Events.MouseStates.pressed:
-                width = screenSize[0] - 120 - self.leftPadding - self.rightPadding  # 60 padding on each side
-                cellSize = 24*2 + 2+2 + 2+2 + 5  # 56 i think
-                cells = width // cellSize
-
-                # rendering the inventory
-                i = 0
-                for slot in self.inventorySlots+self.armorInventory:
-                    x = (i%cells) * cellSize + 60 + self.leftPadding
-                    y = (i//cells) * cellSize + 60
-                    clicked = slot.CheckCollision((x, y), events.mousePos)
-                    if clicked:  # checking if the box was clicked
-                        validToFire = False
-                        if slot.itemType == DropTypes.Armor:  # selecting the armor and deselecting any previously selected ones
-                            if self.selectedArmor > -1:
-                                # resetting the old selected one
-                                oldSlot = self.armorInventory[self.selectedArmor]
-                                oldSlot.highlighted = False
-                                oldSlot.UpdateCash(oldSlot.amount)
-                            
-                            # selecting the new one
-                            self.selectedArmor = self.armorInventory.index(slot)
-                            slot.highlighted = True
-                            slot.UpdateCash(slot.amount)
-                        break
-                    i += 1
+                slot = self.inventoryPanel.HitTest(self, events.mousePos)
+                if isinstance(slot, ItemSlot):  # checking if the box was clicked
+                    validToFire = False
+                    if slot.itemType == DropTypes.Armor:  # selecting the armor and deselecting any previously selected ones
+                        if self.selectedArmor > -1:
+                            # resetting the old selected one
+                            oldSlot = self.armorInventory[self.selectedArmor]
+                            oldSlot.highlighted = False
+                            oldSlot.UpdateCash(oldSlot.amount)
+                        
+                        # selecting the new one
+                        self.selectedArmor = self.armorSlots[slot.name]
+                        self.equippedArmor = playerArmors[slot.name]
+                        slot.highlighted = True
+                        slot.UpdateCash(slot.amount)
+                        self.inventoryPanel.Invalidate()
 
         # checking if the weapon should fire
         if validToFire and weapon.ValidFire(events, dt):
             # firing the weapon
-            self.projectiles += weapon.Fire(self)
+            worldEntities.Extend(weapon.Fire(self))
 
         # reloading the weapon
         if ord("r") in events.held and weapon.capacityLeft < weapon.capacity and not weapon.reloading:
@@ -1234,27 +2547,6 @@ class Player (Entity):
         # updating the parent class (does most of the moving)
         super().Update(events, dt)
         
-        # updating the projectiles
-        aliveProjectiles = []
-        for projectile in self.projectiles:
-            projectile.Update(events, dt)
-
-            # checking if the projectile is still alive
-            alive = time.time() - projectile.lifeTime < projectile.maxLife
-            alive = alive and ((projectile.name == "bullet" and not projectile.collided) or projectile.name != "bullet")
-            if (projectile.name != "spark" or projectile.collision):
-                # checking for collisions with tiles
-                for obj in solidObjects:
-                    alive = alive and not obj.CheckCollision(projectile.position)
-                alive = alive and not TileMapCollision(projectile.position)
-            if alive:
-                aliveProjectiles.append(projectile)
-            else:
-                projectile.Kill()
-        
-        # updating the projectiles
-        self.projectiles = aliveProjectiles
-
         # updating the animation controller
         self.playerAnimation.Update(events, dt)
 
@@ -1263,14 +2555,13 @@ class Player (Entity):
         super().RenderLighting(lightMap, (0, 32))
 
         # rendering the projectile lights
-        for projectile in self.projectiles:
-            projectile.RenderLighting(lightMap)
+        worldEntities.RenderLighting(lightMap)
 
         # muzzel flash
         weapon = self.weaponInventory[self.weaponSlot]
         lastFired = weapon.lastFired
         if weapon.reloading: lastFired = weapon.lastFired + abs(weapon.fireRate) - weapon.reloadSpeed
-        if weapon.fired and time.time() - lastFired < 0.05:  # min(abs(self.weapon.fireRate)-0.005, 0.05):
+        if weapon.fired and GetTime() - lastFired < 0.05:  # min(abs(self.weapon.fireRate)-0.005, 0.05):
             if self.playerAnimation.state == PlayerStates.walkingLeft:
                 muzzleFlash.Render(lightMap, [round(self.position[0]), round(self.position[1] + self.spriteSize[1]//2)])
             else:
@@ -1282,8 +2573,7 @@ class Player (Entity):
         self.sprite = self.playerAnimation.GetCurrentSprite()
 
         # rendering the projectiles
-        for projectile in self.projectiles:
-            projectile.Render(screen)
+        worldEntities.Render(screen)
         
         # rendering the stuff in the parent class
         super().Render(screen)
@@ -1307,9 +2597,9 @@ class Player (Entity):
         if weapon.reloading: lastFired = weapon.lastFired + abs(weapon.fireRate) - weapon.reloadSpeed
 
         # rendering the weapon cooldown
-        cooldown = min((time.time() - weapon.lastFired) / abs(weapon.fireRate), 1)
+        cooldown = min((GetTime() - weapon.lastFired) / abs(weapon.fireRate), 1)
         if weapon.reloading:
-            cooldown = min((time.time() - lastFired) / abs(weapon.reloadSpeed), 1)
+            cooldown = min((GetTime() - lastFired) / abs(weapon.reloadSpeed), 1)
         translatedPosition = [self.position[0] - cameraPos[0] + zoomedScreenSize[0]//2, self.position[1] - cameraPos[1] + zoomedScreenSize[1]//2]
         pygame.draw.rect(screen, [255, 255, 0], [translatedPosition[0] - 17, translatedPosition[1] + 35, 35, 14])
         pygame.draw.rect(screen, [225, 225, 225], [translatedPosition[0] - 15, translatedPosition[1] + 37, 30, 10])
@@ -1360,7 +2650,7 @@ class Weapon:
     # checks if it is valid to fire
     def ValidFire(self, events: Events.Manager, dt: float) -> bool:
         # checking if the time since the last fired shot is long enough
-        if (time.time() - self.lastFired < abs(self.fireRate)): return False
+        if (GetTime() - self.lastFired < abs(self.fireRate)): return False
         
         # checking if the gun and player are out of amo
         if not player.amoInventory[self.amoType] and not self.capacityLeft: return False
@@ -1376,8 +2666,7 @@ class Weapon:
                 self.capacityLeft += player.amoInventory[self.amoType]
                 player.amoInventory[self.amoType] = 0
             
-            amoText.text = f"{player.weaponInventory[player.weaponSlot].capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}"
-            amoText.Update()
+            QueueText(amoText, f"{player.weaponInventory[player.weaponSlot].capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}")
 
 
         # making sure there is amo left
@@ -1396,10 +2685,17 @@ class Weapon:
     def Reload(self) -> None:
         #self.capacityLeft = self.capacity
         if not player.amoInventory[self.amoType]: return
-        self.lastFired = time.time() + self.reloadSpeed - abs(self.fireRate)
+        self.lastFired = GetTime() + self.reloadSpeed - abs(self.fireRate)
         self.reloading = True
         self.fired = False
 
+    # creates a projectile (bullets go into the batched bullet system when it's on)
+    def CreateProjectile(self, position: list, velocity: list, projectiles: list) -> None:
+        if self.projectileObject is Bullet and bulletSystem:
+            bulletSystem.Spawn(position, velocity, self.damage, self.maxLife, self.firer, self.knockback)
+        else:
+            projectiles.append(AcquireParticle(self.projectileObject, position, velocity, self.damage, self.maxLife, self.firer, self.knockback))
+
     # force fires the weapon
     def ForceFire(self, direction: list, entity: Entity) -> list:  # mainly used for mobs so that it doesn't mess with the player (it won't cause a reload and ignors all amo counts)
         # playing a shooting sound
@@ -1417,8 +2713,7 @@ class Weapon:
             length = math.sqrt(dif[0]*dif[0] + dif[1]*dif[1])
             normalized = [dif[0] / length, dif[1] / length]
             velocity = [normalized[0] * 10, normalized[1] * 10]
-            projectile = self.projectileObject([entity.position[0] + velocity[0]*1, entity.position[1] + velocity[1]*1], [velocity[0] * self.speed, velocity[1] * self.speed], self.damage, self.maxLife, self.firer, self.knockback)
-            projectiles.append(projectile)
+            self.CreateProjectile([entity.position[0] + velocity[0]*1, entity.position[1] + velocity[1]*1], [velocity[0] * self.speed, velocity[1] * self.speed], projectiles)
 
             # knockback
             entity.velocity = [entity.velocity[0] - normalized[0] * self.selfKnockback, entity.velocity[1] - normalized[1] * self.selfKnockback]
@@ -1431,13 +2726,12 @@ class Weapon:
         playerShootingSound.play()
 
         # updating the time at which it was last fired
-        self.lastFired = time.time()
+        self.lastFired = GetTime()
         projectiles = []
 
         self.capacityLeft -= 1
         
-        amoText.text = f"{self.capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}"
-        amoText.Update()
+        QueueText(amoText, f"{self.capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}")
 
         for i in range(self.burst):
             self.fired = True
@@ -1448,8 +2742,7 @@ class Weapon:
             length = math.sqrt(dif[0]*dif[0] + dif[1]*dif[1])
             normalized = [dif[0] / length, dif[1] / length]
             velocity = [normalized[0] * 10, normalized[1] * 10]
-            projectile = self.projectileObject([player.position[0] + velocity[0]*1, player.position[1] + velocity[1]*1], [velocity[0] * self.speed, velocity[1] * self.speed], self.damage, self.maxLife, self.firer, self.knockback)
-            projectiles.append(projectile)
+            self.CreateProjectile([player.position[0] + velocity[0]*1, player.position[1] + velocity[1]*1], [velocity[0] * self.speed, velocity[1] * self.speed], projectiles)
 
             # knockback
             player.velocity = [player.velocity[0] - normalized[0] * self.selfKnockback, player.velocity[1] - normalized[1] * self.selfKnockback]
@@ -1457,18 +2750,253 @@ class Weapon:
         # reloading if empty
         if not self.capacityLeft and player.amoInventory[self.amoType] and settings["Gameplay"]["Controls"]["auto reload"]:
             #self.capacityLeft = self.capacity
-            self.lastFired = time.time() + self.reloadSpeed - abs(self.fireRate)
+            self.lastFired = GetTime() + self.reloadSpeed - abs(self.fireRate)
             self.reloading = True
         
         # returning the projectiles
         return projectiles
 
 
+# =============================================================================
+#                               Headless Simulation
+#=============================================================================
+
+
+# an event manager that plays back scripted input instead of reading the keyboard and mouse (used when running headless)
+class ScriptedEvents (Events.Manager):
+    # each entry in the script is {"start": frame, "end": frame, "held": [keys], "typed": [chars], "click": "left"/"right", "mousePos": [x, y], "aim": "mob"}
+    def __init__(self, script: list) -> None:
+        super().__init__()
+        self.script = script
+        self.frame = 0
+        self.releasedMouseStates = dict(self.mouseStates)  # the resting states of the mouse buttons
+
+    # converts a key name from the script into a key code
+    def GetKeyCode(self, key: str) -> int:
+        if len(key) == 1: return ord(key)
+        return pygame.key.key_code(key)
+
+    # points the mouse at the closest mob (so scripted fire actually hits things)
+    def AimAtNearestMob(self) -> None:
+        if not mobs: return
+        positions = mobBatch.positions[:mobBatch.count].tolist() if mobBatch else [mob.position for mob in mobs]
+        nearest = min(positions, key=lambda position: (position[0] - player.position[0])**2 + (position[1] - player.position[1])**2)
+        # the same screen transform the weapons use to turn the mouse into a direction
+        self.mousePos = [nearest[0] - cameraPos[0] + screenSize[0]//2, nearest[1] - cameraPos[1] + screenSize[1]//2]
+
+    # updating the events from the script
+    def GetEvents(self) -> None:
+        pygame.event.pump()  # keeping the dummy display happy
+
+        self.held = set()
+        self.events = set()
+        self.typed = []
+        self.scrollSpeed = 0
+        self.mouseStates = dict(self.releasedMouseStates)
+
+        for entry in self.script:
+            if not (entry["start"] <= self.frame < entry.get("end", entry["start"]+1)): continue
+            firstFrame = self.frame == entry["start"]
+
+            # holding keys (they're only counted as an event on the first frame)
+            for key in entry.get("held", []):
+                keyCode = self.GetKeyCode(key)
+                self.held.add(keyCode)
+                if firstFrame: self.events.add(keyCode)
+            if firstFrame: self.typed += entry.get("typed", [])
+
+            # clicking the mouse
+            if "mousePos" in entry: self.mousePos = entry["mousePos"]
+            if entry.get("aim") == "mob": self.AimAtNearestMob()
+            if "click" in entry:
+                self.mouseStates[entry["click"]] = Events.MouseStates.pressed if firstFrame else Events.MouseStates.held
+
+        self.frame += 1
+
+
+# the input played back when no script is given (walking around the level while spawning a couple waves of mobs and shooting at them, so deaths, sparks and drops get measured too)
+defaultBenchmarkScript = [
+    {"start": 0, "end": 1, "held": ["p"]},
+    {"start": 30, "end": 300, "held": ["d"]},
+    {"start": 120, "end": 600, "held": ["s"]},
+    {"start": 200, "end": 201, "held": ["space"]},
+    {"start": 300, "end": 700, "held": ["a"]},
+    {"start": 600, "end": 601, "held": ["p"]},
+    {"start": 700, "end": 1000, "held": ["w", "d"]},
+    {"start": 1000, "end": 1200, "held": ["s"]},
+]
+for cycleStart in range(40, 1200, 380):  # emptying the six shot pistol (0.2 seconds between shots) at the closest mob and then reloading (which takes 1.75 seconds)
+    for shot in range(6):
+        defaultBenchmarkScript.append({"start": cycleStart + shot*30, "end": cycleStart + shot*30 + 3, "click": "left", "aim": "mob"})
+    defaultBenchmarkScript.append({"start": cycleStart + 160, "end": cycleStart + 162, "held": ["r"]})
+
+
+# prints the timings collected while running headless
+def PrintBenchmark() -> None:
+    print(f"Simulated {simulatedFrames} frames at dt={dt} (seed {arguments.seed})")
+    profiler.PrintReport()
+    print(f"Surface pool: {surfacePool.hits} hits | {surfacePool.misses} misses")
+    print(f"Light sprites: {lightSprites.hits} hits | {lightSprites.misses} misses")
+    print(f"Text cache: {textCache.hits} hits | {textCache.misses} misses")
+    print(f"Flow fields: {flowField.hits} hits | {flowField.misses} misses")
+    for particleClass, pool in particlePools.items():
+        print(f"{particleClass.__name__} pool: {pool.hits} hits | {pool.misses} misses")
+    print(f"Mobs alive: {len(mobs)} | Projectiles: {len(worldEntities)} | Bullets: {bulletSystem.count if bulletSystem else 0} | Player position: {[round(player.position[0], 2), round(player.position[1], 2)]}")
+
+
+# =============================================================================
+#                               Profiling
+#=============================================================================
+
+
+# times named scopes of the frame and keeps the most recent samples in ring buffers
+class FrameProfiler:
+    def __init__(self, enabled: bool, historySize: int=600) -> None:
+        self.enabled = enabled
+        self.historySize = historySize  # the number of frames kept for each scope
+
+        self.samples = {}  # scope name -> deque of durations (in seconds)
+        self.startTimes = {}  # scope name -> the time the scope was started
+
+        # the overlay is only re-drawn every so often since drawing text is slow
+        self.showOverlay = enabled and not HEADLESS
+        self.overlay = None
+        self.lastOverlayUpdate = 0
+
+    # starts timing a scope
+    def Begin(self, name: str) -> None:
+        if not self.enabled: return
+        self.startTimes[name] = time.perf_counter()
+
+    # stops timing a scope and stores the sample
+    def End(self, name: str) -> None:
+        if not self.enabled: return
+        duration = time.perf_counter() - self.startTimes[name]
+        if name not in self.samples: self.samples[name] = collections.deque(maxlen=self.historySize)
+        self.samples[name].append(duration)
+
+    # gets the 50th, 95th and 99th percentiles of a scope (in seconds)
+    def GetPercentiles(self, name: str) -> tuple:
+        ordered = sorted(self.samples[name])
+        last = len(ordered) - 1
+        return tuple(ordered[round(last * percentile)] for percentile in (0.5, 0.95, 0.99))
+
+    # gets a row of stats for every scope: [name, mean, p50, p95, p99] (in milliseconds)
+    def GetStats(self) -> list:
+        stats = []
+        for name, samples in self.samples.items():
+            p50, p95, p99 = self.GetPercentiles(name)
+            stats.append([name, sum(samples)/len(samples)*1000, p50*1000, p95*1000, p99*1000])
+        return stats
+
+    # prints a table of the stats
+    def PrintReport(self) -> None:
+        print(f"{'Scope':<22}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, mean, p50, p95, p99 in self.GetStats():
+            print(f"{name:<22}{mean:>10.3f}{p50:>10.3f}{p95:>10.3f}{p99:>10.3f}")
+
+    # renders the stats on top of the screen
+    def RenderOverlay(self, screen: pygame.Surface) -> None:
+        if not self.showOverlay or not self.samples: return
+
+        # re-drawing the cashed overlay a couple times a second
+        if time.time() - self.lastOverlayUpdate > 0.5 or not self.overlay:
+            self.lastOverlayUpdate = time.time()
+            stats = self.GetStats()
+            self.overlay = pygame.Surface((330, 20 + len(stats)*16))
+            self.overlay = self.overlay.convert()
+            self.overlay.fill((0, 0, 0))
+            UI.DrawText(self.overlay, 12, "pixel2.ttf", "scope  mean  p50  p95  p99 (ms)", (5, 3), (255, 255, 0))
+            for i, (name, mean, p50, p95, p99) in enumerate(stats):
+                UI.DrawText(self.overlay, 12, "pixel2.ttf", f"{name}  {mean:.2f}  {p50:.2f}  {p95:.2f}  {p99:.2f}", (5, 19 + i*16), (255, 255, 255))
+        
+        screen.blit(self.overlay, (screen.get_width() - self.overlay.get_width() - 10, 70))
+
+    # writes the collected samples to a file (csv or json depending on the extension)
+    def Dump(self, path: str) -> None:
+        if not self.samples: return
+        if path.endswith(".csv"):
+            with open(path, "w") as file:
+                file.write("scope,mean_ms,p50_ms,p95_ms,p99_ms\n")
+                for name, mean, p50, p95, p99 in self.GetStats():
+                    file.write(f"{name},{mean:.4f},{p50:.4f},{p95:.4f},{p99:.4f}\n")
+        else:
+            with open(path, "w") as file:
+                json.dump({
+                    "stats": {name: {"mean": mean, "p50": p50, "p95": p95, "p99": p99} for name, mean, p50, p95, p99 in self.GetStats()},
+                    "samples": {name: [duration*1000 for duration in samples] for name, samples in self.samples.items()}
+                }, file, indent=4)
+
+
+# =============================================================================
+#                               Dirty Rects
+#=============================================================================
+
+
+# keeps track of which parts of the window changed so the world only gets redrawn when it has to and only changed parts get sent to the display
+class DirtyRects:
+    def __init__(self) -> None:
+        self.rects = []  # the parts of the window changing this frame
+        self.lastRects = []  # the parts that changed last frame (they have to be cleared back to the world)
+        self.fullUpdate = True
+        self.lastFullUpdate = True
+
+        self.worldSignature = None  # what the world looked like when it was last drawn
+        self.worldChanged = True  # for changes the signature doesn't cover (like tiles being broken)
+        self.background = None  # the last render of the world scaled to the window
+
+    # checks if the world has to be redrawn this frame (a signature of None means it always has to be)
+    def CheckWorld(self, signature: tuple) -> bool:
+        redraw = signature is None or signature != self.worldSignature or self.worldChanged or self.background is None
+        self.worldSignature = signature
+        self.worldChanged = False
+        return redraw
+
+    # scales a new render of the world to the window
+    def SetBackground(self, zoomDisplay: pygame.Surface, size: tuple) -> None:
+        if self.background is None or self.background.get_size() != size:
+            self.background = pygame.Surface(size)
+            self.background = self.background.convert()
+        pygame.transform.scale(zoomDisplay, size, self.background)
+
+    # marks part of the window as changed (the hud passes in the rects its draw calls return)
+    def Add(self, rect: list) -> None:
+        self.rects.append(pygame.Rect(rect))
+
+    # marks the whole window as changed
+    def MarkAll(self) -> None:
+        self.fullUpdate = True
+
+    # puts the world back over what was drawn last frame (the window is the world everywhere else, so the hud can then be drawn anywhere)
+    def RestoreBackground(self, screen: pygame.Surface) -> None:
+        if self.fullUpdate or self.lastFullUpdate:
+            screen.blit(self.background, (0, 0))
+            return
+        
+        for rect in self.lastRects:
+            screen.blit(self.background, rect, rect)
+
+    # sends the changed parts to the display
+    def Flush(self) -> None:
+        if self.fullUpdate or self.lastFullUpdate: pygame.display.update()  # the whole window was restored (like a menu closing)
+        else: pygame.display.update(self.lastRects + self.rects)
+
+        # moving on to the next frame
+        self.lastRects, self.rects = self.rects, []
+        self.lastFullUpdate, self.fullUpdate = self.fullUpdate, False
+
+
 # =============================================================================
 #                               Functions
 #=============================================================================
 
 
+# gets the current game time (a simulated clock when headless so runs can be reproduced)
+def GetTime() -> float:
+    if HEADLESS: return simulatedTime
+    return time.time()
+
+
 # does box-box collision on two boxes (not hitboxes)
 def BoxCollision(box1: list, box2: list) -> bool:
     return (
@@ -1484,44 +3012,39 @@ def BoxCollision(box1: list, box2: list) -> bool:
 def GetClippedArea() -> None:
     global litAreas
 
-    # combining overlapping boxes
-    safeBoxes = litAreas[::]
-    litAreas = []
-    while len(safeBoxes) > 0:  # looping through all the boxes
-        # getting the current box and removing it
-        newBox = safeBoxes[0]
-        del safeBoxes[0]
-
-        # looping through all the boxes and combining
-        newSafeBoxes = []
-        for box in safeBoxes:
-            if BoxCollision(newBox, box):
-                # combining the boxes together
-                minX = min(newBox[0], box[0])
-                minY = min(newBox[1], box[1])
-                maxX = max(newBox[0]+newBox[2], box[0]+box[2])
-                maxY = max(newBox[1]+newBox[3], box[1]+box[3])
-
-                newBox = [minX, minY, maxX-minX, maxY-minY]
-            else:
-                newSafeBoxes.append(box)
-        safeBoxes = newSafeBoxes
-
-        litAreas.append(newBox)
-
-    # clipping all the boxes to the screen
-    litAreasClipped = []
+    # clipping the boxes to the screen (as left, top, right, bottom)
+    boxes = []
     for area in litAreas:
-        newXY = [max(area[0], 0), max(area[1], 0),]
-        newSize = [area[2] + (area[0]-newXY[0]), area[3] + (area[1]-newXY[1])]
-        newBox = [
-            newXY[0],
-            newXY[1],
-            newSize[0] - max((newXY[0] + newSize[0]) - zoomedScreenSize[0], 0),
-            newSize[1] - max((newXY[1] + newSize[1]) - zoomedScreenSize[1], 0)
-        ]
-        litAreasClipped.append(newBox)
-    litAreas = litAreasClipped
+        left, top = max(math.floor(area[0]), 0), max(math.floor(area[1]), 0)
+        right, bottom = min(math.ceil(area[0] + area[2]), math.ceil(zoomedScreenSize[0])), min(math.ceil(area[1] + area[3]), math.ceil(zoomedScreenSize[1]))
+        if right > left and bottom > top: boxes.append((left, top, right, bottom))
+
+    # the boxes enter and leave the sweep at their left and right sides, and their vertical extents are kept in a segment tree
+    events = sorted([(box[0], 1, box) for box in boxes] + [(box[2], -1, box) for box in boxes])
+    coordinates = sorted({y for box in boxes for y in (box[1], box[3])})
+    coordinateIndex = {y: i for i, y in enumerate(coordinates)}
+    coverTree = CoverTree(coordinates)
+
+    # sweeping across the screen, the strip between each pair of edges is covered by the union of the boxes spanning it
+    # rects keep getting extended to the right for as long as the same vertical span stays lit so they come out disjoint and mostly merged
+    litAreas = []
+    openRects = {}  # (top, bottom) -> the left of a rect that's still being extended
+    i = 0
+    while i < len(events):
+        # updating which boxes cover this strip
+        x = events[i][0]
+        while i < len(events) and events[i][0] == x:
+            box, delta = events[i][2], events[i][1]
+            coverTree.Update(coordinateIndex[box[1]], coordinateIndex[box[3]], delta)
+            i += 1
+        spans = set(coverTree.GetSpans())
+        
+        # closing the rects whose span ended here and starting the new ones
+        for span in [span for span in openRects if span not in spans]:
+            left = openRects.pop(span)
+            litAreas.append([left, span[0], x - left, span[1] - span[0]])
+        for span in spans:
+            if span not in openRects: openRects[span] = x
 
 
 # renders the ground
@@ -1538,20 +3061,6 @@ def RenderGround(zoomDisplay: pygame.Surface) -> None:
             #groundSprites.add()
             zoomDisplay.blit(groundTiles[round((x+y+bxy)%4)], [topLeftStart[0]+x*64, topLeftStart[1]+y*64])
 
-# renders the ground within a specificed area
-def RenderGroundWindow(zoomDisplay: pygame.Surface, pos: tuple, size: tuple) -> None:
-    # finding the constraints for the tiles
-    topLeft = [cameraPos[0] - zoomedScreenSize[0]//2 + pos[0], cameraPos[1] - zoomedScreenSize[1]//2 + pos[1]]
-    topLeftStart = [-round(topLeft[0] % tileMap.tileSize) + pos[0], -round(topLeft[1] % tileMap.tileSize) + pos[1]]
-    dstAcross = [math.ceil(size[0]/tileMap.tileSize)+1, math.ceil(size[1]/tileMap.tileSize)+1]
-    bxy = topLeft[0]//tileMap.tileSize + topLeft[1]//tileMap.tileSize
-
-    # rendering each tile
-    for x in range(dstAcross[0]):
-        for y in range(dstAcross[1]):
-            #groundSprites.add()
-            zoomDisplay.blit(groundTiles[round((x+y+bxy)%4)], [topLeftStart[0]+x*64, topLeftStart[1]+y*64])
-
 
 # drops loot
 def DropLoot(drops, position) -> None:
@@ -1571,12 +3080,39 @@ def DropLoot(drops, position) -> None:
             # creating the dropped item
             if drop[0] == DropTypes.Amo:  # dropping amo                    
                 dropSprite = amoSprites[[AmoType.Pistol, AmoType.LargeRifle, AmoType.Shotgun, AmoType.Rifle].index(drop[1])]
-                dropped = DroppedItem(dropSprite, position, randomVelocity, drop[0], drop[1], amount=amount)
-                player.projectiles.append(dropped)
+                dropped = AcquireParticle(DroppedItem, dropSprite, position, randomVelocity, drop[0], drop[1], amount=amount)
+                worldEntities.Add(dropped)
             elif drop[0] == DropTypes.Part:  # dropping parts
-                dropSprite = partDropSprites[partNames.index(drop[1])]
-                dropped = DroppedItem(dropSprite, position, randomVelocity, DropTypes.Part, drop[1], amount=amount)
-                player.projectiles.append(dropped)
+                dropSprite = partDropSprites[partIndices[drop[1]]]
+                dropped = AcquireParticle(DroppedItem, dropSprite, position, randomVelocity, DropTypes.Part, drop[1], amount=amount)
+                worldEntities.Add(dropped)
+
+
+# gets a particle from its pool (or just creates it if there's no pool for its class)
+def AcquireParticle(particleClass: type, *args, **kwargs) -> Particle:
+    pool = particlePools.get(particleClass)
+    if pool: return pool.Acquire(*args, **kwargs)
+    return particleClass(*args, **kwargs)
+
+
+# gives a dead particle back to its pool
+def ReleaseParticle(particle: Particle) -> None:
+    pool = particlePools.get(type(particle))
+    if pool: pool.Release(particle)
+
+
+# gets everything the world's render depends on (None if something in it is always changing) so frames that would look the same can be skipped
+def GetWorldSignature() -> tuple:
+    if DEV_MODE or mobs or len(worldEntities) or (bulletSystem and bulletSystem.count): return None
+
+    # the weapon cooldown bar and muzzle flash change every frame until they're done
+    weapon = player.weaponInventory[player.weaponSlot]
+    if weapon.reloading or GetTime() - weapon.lastFired < max(abs(weapon.fireRate), abs(weapon.reloadSpeed)) + 0.1: return None
+    
+    return (
+        screenSize, zoomedScreenSize, round(cameraPos[0], 2), round(cameraPos[1], 2),
+        round(player.position[0], 2), round(player.position[1], 2), player.playerAnimation.GetCurrentSprite(), player.playerAnimation.state, int(player.playerAnimation.frame % 2), player.weaponSlot
+    )
 
 
 # mixes two values
@@ -1584,42 +3120,265 @@ def Mix(l: any, r: any, v: float) -> float:
     return l * (1 - v) + r * v
 
 
+# gets the hitboxes of the tile at a position from the collision grid (None if there aren't any)
+def GetCollisionCell(pos: tuple) -> list:
+    gridX, gridY = int(pos[0]//tileMap.tileSize), int(pos[1]//tileMap.tileSize)
+    if gridX < 0 or gridY < 0 or gridY >= len(collisionGrid) or gridX >= len(collisionGrid[gridY]): return None
+    return collisionGrid[gridY][gridX]
+
+
 # checks for a collision with a block for a given position
 def TileMapCollision(pos: tuple) -> bool:
-    tile = tileMap.GetTileNumber(tileMap.GetGridPosition(pos))
-    if tile in solidTiles:
-        # pulling up the hitbox and checking
-        #tilePosition = (round(pos[0] // tileMap.tileSize), round(pos[1] // tileMap.tileSize))
+    hitBox = GetCollisionCell(pos)
+    if hitBox:
+        # checking the hitbox
         subPosition = (pos[0] % tileMap.tileSize, pos[1] % tileMap.tileSize)
-        hitBox = tileHitBoxes[solidTiles.index(tile)]
-        return max(box.Collide(subPosition) for box in hitBox)
-    else: return False
+        for box in hitBox:
+            if box.Collide(subPosition): return True
+    return False
+
+
+# changes a tile in the map (keeping the collision grid in sync)
+def SetTile(gridPosition: tuple, tile: int) -> None:
+    tileMap.map[gridPosition[1]][gridPosition[0]] = tile
+    collisionGrid[gridPosition[1]][gridPosition[0]] = tileHitBoxLookup[tile]
+    if bulletSystem: bulletSystem.tileArray[gridPosition[1], gridPosition[0]] = tile
+    lineOfSight.Invalidate()
+    flowField.Invalidate()
+    dirtyRects.worldChanged = True
+    tileChunks.Invalidate(gridPosition)
+    if mobBatch: mobBatch.tileArray[gridPosition[1], gridPosition[0]] = tile
+    worldEntities.Wake([gridPosition[0]*tileMap.tileSize, gridPosition[1]*tileMap.tileSize, tileMap.tileSize, tileMap.tileSize])  # anything resting in the tile might now be inside of it
+
+
+# breaks a barrel or opens an amo crate if there's one at a position (for when a bullet hits something)
+def BreakTile(position: tuple) -> None:
+    gridPosition = tileMap.GetGridPosition(position)
+    tile = tileMap.GetTileNumber(gridPosition)
+    if tile == 22:  # checking if the bullet hit a wooden barrel
+        # breaking the barrel
+        SetTile(gridPosition, 30)
+        SetTile([gridPosition[0], gridPosition[1]-1], 0)
+
+        # dropping loot
+        DropLoot(woodenBarrelDrops, position)
+    elif tile == 29:  # checking for an amo crate
+        # opening the amo crate
+        SetTile(gridPosition, 39)
+
+        # dropping loot
+        DropLoot(amoCrateDrops, [gridPosition[0]*64+32, gridPosition[1]*64+88])
+
+
+# re-bakes the shadows of the lights an object casts shadows from (called by AddObject and RemoveObject)
+def InvalidateShadows(obj: ShadowedObject) -> None:
+    staticLightMap.Invalidate([light for light in lights if light.InRange(obj)])
+
+
+# adds a solid object to the level, keeping everything that depends on the objects up to date
+def AddObject(obj: ShadowedObject) -> None:
+    solidObjects.append(obj)
+    objectGrid.Insert(obj, obj.GetBox())
+    ObjectsChanged(obj)
+
+
+# removes a solid object from the level (to move an object remove it and add it back at its new position)
+def RemoveObject(obj: ShadowedObject) -> None:
+    solidObjects.remove(obj)
+    objectGrid.Remove(obj)
+    ObjectsChanged(obj)
+
+
+# updates the things that cache where the objects are after one was added or removed
+def ObjectsChanged(obj: ShadowedObject) -> None:
+    InvalidateShadows(obj)
+    lineOfSight.Invalidate()
+    flowField.LoadObjects()
+    if bulletSystem: bulletSystem.LoadObjects()
+    if mobBatch: mobBatch.LoadObjects()
+    dirtyRects.worldChanged = True
+
+
+# adds a new mob to the world (into the batch when the mobs are batched, otherwise into the mobs list and grid)
+def SpawnMob(enemy: Enemy) -> None:
+    if mobBatch: mobBatch.Add(enemy)
+    else:
+        mobs.append(enemy)
+        mobGrid.Insert(enemy, enemy.GetBox())
+
+
+# gets the world space boxes (x, y, width, height) of every tile and object hitbox touching an area
+def GetNearbyHitBoxes(area: tuple, collidables: list=[]) -> list:
+    boxes = []
+
+    # the tiles
+    tileSize = tileMap.tileSize
+    left, top = max(int(area[0]//tileSize), 0), max(int(area[1]//tileSize), 0)
+    right, bottom = min(int((area[0]+area[2])//tileSize), len(collisionGrid[0])-1), min(int((area[1]+area[3])//tileSize), len(collisionGrid)-1)
+    for y in range(top, bottom+1):
+        row = collisionGrid[y]
+        for x in range(left, right+1):
+            if row[x]:
+                for box in row[x]:
+                    boxes.append((x*tileSize + box.pos[0], y*tileSize + box.pos[1], box.size[0], box.size[1]))
+    
+    # the objects
+    for obj in itertools.chain(objectGrid.Query(area), collidables):
+        boxes += obj.worldHitBoxes
+    
+    return boxes
 
 
-# gets the hitbox if any for a given position
-def GetTileMapCollisionHitbox(pos: tuple) -> object:
-    tile = tileMap.GetTileNumber(tileMap.GetGridPosition(pos))
-    if tile in solidTiles:
-        return tileHitBoxes[solidTiles.index(tile)]
+# sweeps a box (x, y, width, height) along a movement against a list of boxes
+# returns the time of impact (0-1, 1 if nothing was hit) and the normal of what was hit
+def SweepBox(box: tuple, deltaX: float, deltaY: float, boxes: list) -> tuple:
+    x, y, width, height = box
+    skin = 0.01  # boxes that overlap by less than this are counted as touching
+    
+    toi, normalX, normalY = 1, 0, 0
+    for bx, by, bw, bh in boxes:
+        # ignoring boxes that are already overlapping so an entity stuck inside something can get out
+        if x < bx+bw-skin and x+width > bx+skin and y < by+bh-skin and y+height > by+skin: continue
+
+        # the times the box enters and leaves the other box along each axis
+        if deltaX > 0:   xEntry, xExit = (bx - (x+width)) / deltaX, (bx+bw - x) / deltaX
+        elif deltaX < 0: xEntry, xExit = (bx+bw - x) / deltaX, (bx - (x+width)) / deltaX
+        elif x+width <= bx+skin or x >= bx+bw-skin: continue  # not moving and not lined up
+        else: xEntry, xExit = -math.inf, math.inf
+        
+        if deltaY > 0:   yEntry, yExit = (by - (y+height)) / deltaY, (by+bh - y) / deltaY
+        elif deltaY < 0: yEntry, yExit = (by+bh - y) / deltaY, (by - (y+height)) / deltaY
+        elif y+height <= by+skin or y >= by+bh-skin: continue
+        else: yEntry, yExit = -math.inf, math.inf
+
+        entry = max(xEntry, yEntry)
+        if entry > min(xExit, yExit) or entry >= toi or min(xExit, yExit) <= 0: continue  # missed or hit later than something else
+        
+        toi = max(entry, 0)
+        if xEntry > yEntry: normalX, normalY = (-1 if deltaX > 0 else 1), 0
+        else: normalX, normalY = 0, (-1 if deltaY > 0 else 1)
+
+    return toi, normalX, normalY
+
+
+# finds how far along a segment (0-1) it first touches a box (x, y, width, height), None if it never does
+def SegmentBoxHit(start: tuple, delta: tuple, box: tuple) -> float:
+    enter, leave = 0, 1
+    for axis in range(2):
+        boxMin, boxMax = box[axis], box[axis] + box[axis+2]
+        if delta[axis] == 0:
+            if start[axis] < boxMin or start[axis] > boxMax: return None  # running parallel and outside the box
+            continue
+        
+        t1, t2 = (boxMin - start[axis]) / delta[axis], (boxMax - start[axis]) / delta[axis]
+        enter, leave = max(enter, min(t1, t2)), min(leave, max(t1, t2))
+        if enter > leave: return None
+    return enter
+
+
+# finds how far along a segment (0-1) it first touches a collideable solid object's hitbox, None if it never does
+def SegmentObjectHit(start: tuple, delta: tuple) -> float:
+    hitTime = None
+    for obj in objectGrid.Query([min(start[0], start[0] + delta[0]), min(start[1], start[1] + delta[1]), abs(delta[0]), abs(delta[1])]):
+        for box in obj.worldHitBoxes:
+            boxHitTime = SegmentBoxHit(start, delta, box)
+            if boxHitTime is not None and (hitTime is None or boxHitTime < hitTime): hitTime = boxHitTime
+    return hitTime
+
+
+# casts a ray from start to end through the tile map and returns the first tile hitbox it hits (None if nothing is hit)
+# only the tiles the ray passes through are checked (grid traversal) and then the ray is tested against their exact hitboxes
+# tiles in fullTiles are hit anywhere in their tile instead of just their hitboxes
+def Raycast(start: tuple, end: tuple, fullTiles: list=[]) -> RaycastHit:
+    tileSize = tileMap.tileSize
+    delta = (end[0] - start[0], end[1] - start[1])
+    cellX, cellY = int(start[0]//tileSize), int(start[1]//tileSize)
+    endX, endY = int(end[0]//tileSize), int(end[1]//tileSize)
+
+    # how far along the ray each step to the next cell is
+    stepX, stepY = (1 if delta[0] > 0 else -1), (1 if delta[1] > 0 else -1)
+    tDeltaX = tileSize / abs(delta[0]) if delta[0] else math.inf
+    tDeltaY = tileSize / abs(delta[1]) if delta[1] else math.inf
+    tMaxX = ((cellX + (stepX > 0)) * tileSize - start[0]) / delta[0] if delta[0] else math.inf
+    tMaxY = ((cellY + (stepY > 0)) * tileSize - start[1]) / delta[1] if delta[1] else math.inf
+
+    enteredAt = 0  # when the ray entered the current cell
+    while enteredAt <= 1:
+        # the ray left the map
+        if cellX < 0 or cellY < 0 or cellY >= len(collisionGrid) or cellX >= len(collisionGrid[cellY]):
+            return RaycastHit([start[0] + delta[0]*enteredAt, start[1] + delta[1]*enteredAt], [cellX, cellY], None, enteredAt)
+        
+        # checking the tile the ray is in
+        tile = tileMap.map[cellY][cellX]
+        hitTime = enteredAt if tile in fullTiles else None
+        if hitTime is None and collisionGrid[cellY][cellX]:
+            for box in collisionGrid[cellY][cellX]:
+                boxHitTime = SegmentBoxHit(start, delta, (cellX*tileSize + box.pos[0], cellY*tileSize + box.pos[1], box.size[0], box.size[1]))
+                if boxHitTime is not None and (hitTime is None or boxHitTime < hitTime): hitTime = boxHitTime
+        if hitTime is not None:
+            return RaycastHit([start[0] + delta[0]*hitTime, start[1] + delta[1]*hitTime], [cellX, cellY], tile, hitTime)
+        
+        # moving to the next cell
+        if cellX == endX and cellY == endY: break
+        if tMaxX < tMaxY:
+            enteredAt = tMaxX
+            tMaxX += tDeltaX
+            cellX += stepX
+        else:
+            enteredAt = tMaxY
+            tMaxY += tDeltaY
+            cellY += stepY
+    return None
+
+
+# moves a box as far as it can go and slides it along whatever it hits
+# returns the movement that was made and if the x and y directions were blocked
+def MoveAndSlide(box: tuple, deltaX: float, deltaY: float, collidables: list=[]) -> tuple:
+    if not deltaX and not deltaY: return 0, 0, False, False
+
+    # only the boxes around the entire movement are checked
+    area = (min(box[0], box[0]+deltaX), min(box[1], box[1]+deltaY), box[2] + abs(deltaX), box[3] + abs(deltaY))
+    boxes = GetNearbyHitBoxes(area, collidables)
+    if DEV_MODE: hitBoxesToRender.extend(boxes)
+
+    x, y = box[0], box[1]
+    blockedX, blockedY = False, False
+    for i in range(2):  # the first move and then one slide
+        toi, normalX, normalY = SweepBox((x, y, box[2], box[3]), deltaX, deltaY, boxes)
+        x += deltaX * toi
+        y += deltaY * toi
+        if toi >= 1: break
+
+        # sliding along the surface with the rest of the movement
+        deltaX, deltaY = deltaX * (1-toi), deltaY * (1-toi)
+        if normalX:
+            blockedX = True
+            deltaX = 0
+        else:
+            blockedY = True
+            deltaY = 0
+    
+    return x - box[0], y - box[1], blockedX, blockedY
 
 
 # loads a level
 def LoadLevel(levelName: str) -> None:
-    global tileMap, solidObjects, lights
+    global tileMap, solidObjects, lights, staticLightMap, objectGrid, mobGrid, collisionGrid, lineOfSight, tileChunks, flowField
     solidObjects = []
     lights = []
 
     # loading the tileMap for the level
     tileMap = TileMap.TileMap(f"{levelName}.txt", tiles, 64)
 
+    # the hitboxes for every tile in the map (so checking a point is a single lookup)
+    collisionGrid = [[tileHitBoxLookup[tile] for tile in row] for row in tileMap.map]
+
     # opening the level information json file
     levelFile = json.load(open(f"{levelName}.json"))
 
     # loading the solid objects
     for obj in levelFile["Objects"]:
-        hitBox = None
-        if obj["tileNumber"] in solidTiles:
-            hitBox = tileHitBoxes[solidTiles.index(obj["tileNumber"])]
+        hitBox = tileHitBoxLookup[obj["tileNumber"]]
         solidObjects.append(ShadowedObject(
             obj["position"],
             obj["size"],
@@ -1629,6 +3388,15 @@ def LoadLevel(levelName: str) -> None:
             renderObject=obj["renderSelf"],
             collideable=obj["collideable"],
         ))
+    
+    # indexing the objects and mobs by the tiles they're in
+    objectGrid = SpatialGrid(tileMap.tileSize)
+    for obj in solidObjects:
+        objectGrid.Insert(obj, obj.GetBox())
+    mobGrid = SpatialGrid(tileMap.tileSize)
+    if not mobBatch:  # (the batched mobs are found through the batch instead)
+        for enemy in mobs:
+            mobGrid.Insert(enemy, enemy.GetBox())
 
     # loading the lights
     for light in levelFile["Lights"]:
@@ -1640,6 +3408,18 @@ def LoadLevel(levelName: str) -> None:
             light["position"]
         ))
 
+    # starting the caches of the level over (the line of sight results, the rendered tile chunks and the paths to the player)
+    lineOfSight = LineOfSight()
+    tileChunks = TileChunkCache()
+    flowField = FlowField()
+
+    # updating the batched bullets' and mobs' copies of the map
+    if bulletSystem: bulletSystem.LoadMap()
+    if mobBatch: mobBatch.LoadMap()
+
+    # baking the lights and their shadows into a light map (the lights and objects don't move so it only has to be done once)
+    staticLightMap = StaticLightMap(lights)
+
 
 # updates the different things effected by the settings
 def UpdateSettings() -> None:
@@ -1652,12 +3432,18 @@ def UpdateSettings() -> None:
 
 # the settings for variouse things
 settings = {
+    "performance": {
+        "batchedBullets": numpy is not None,  # simulating the bullets with numpy (needs numpy to be installed)
+        "batchedMobs": numpy is not None  # simulating the mobs with numpy (needs numpy to be installed)
+    },
     "render": {
         "lighting": {  # aka shadows
             "bullet": False,  # (lighting for this is currently disabled anyways) doesn't visually really do anything because the lighting is so minimal
             "sparks": False,  # doesn't visually really do anything because the lighting is so minimal
             "muzzleFlash": False
-        }
+        },
+        "lightBackend": arguments.light_backend,  # "numpy" adds the lights up in a numpy buffer instead of blending surfaces (needs numpy to be installed)
+        "lightDownscale": arguments.light_downscale  # the numpy light buffer can run at a lower resolution on big windows
     },
     "Gameplay": {
         "Controls": {
@@ -1671,6 +3457,11 @@ settings = {
 #                               General Variables
 #=============================================================================
 
+# making headless runs reproducible
+simulatedTime = 0  # the game clock when headless (advanced by the fixed dt every frame)
+simulatedFrames = 0
+if HEADLESS: random.seed(arguments.seed)
+
 # creating the screen
 screenSize = (1200, 750)
 oldScreenSize = (1200, 750)
@@ -1684,6 +3475,28 @@ zoomDisplay = zoomDisplay.convert()
 # creating the light map
 lightMap = pygame.Surface(screenSize)
 lightMap = lightMap.convert()
+lightBuffer = None  # the numpy light backend (the lights get rendered into this instead of the light map)
+if settings["render"]["lightBackend"] == "numpy" and numpy is not None: lightBuffer = LightBuffer(screenSize, settings["render"]["lightDownscale"])
+
+# scratch surfaces shared by the lights and shadows
+surfacePool = SurfacePool()
+
+# the falloff sprites shared between lights that look the same
+lightSprites = LightSpriteCache()
+
+# the cached fonts and rendered strings for drawing text
+textCache = TextCache()
+
+# free lists for the short lived particles (so big fights don't allocate a new object for every bullet and spark)
+particlePools = {
+    Bullet: ObjectPool(Bullet),
+    SparksParticle: ObjectPool(SparksParticle),
+    DroppedItem: ObjectPool(DroppedItem, maxFree=128)
+}
+restingSpeed = 1  # the speed (pixels per second) below which slowing particles come to rest and stop running their physics
+
+# the bullets, sparks and dropped items in the world
+worldEntities = WorldEntities()
 
 # loading sounds
 playerShootingSound = Sounds.Sound("shooting.wav", volume=0.5, channel=SoundChannels.playerShooting.value)
@@ -1780,6 +3593,11 @@ tileHitBoxes = [
     [HitBox((0, 0), (64, 64))],  # 96 fence
 ]
 
+# the hitboxes indexed by the tile number (None for tiles that aren't solid)
+tileHitBoxLookup = [None] * max(len(tiles), solidTiles[-1]+1)
+for tile, hitBoxes in zip(solidTiles, tileHitBoxes):
+    tileHitBoxLookup[tile] = hitBoxes
+
 # the centers of the tiles so they can be sorted by depth
 tileCenters = {}
 for i in range(97):
@@ -1823,6 +3641,7 @@ bulletSprite = bulletSprite.convert()
 bulletSprite.set_colorkey((0, 0, 0))
 pygame.draw.circle(bulletSprite, (125, 62, 0), (3, 3), 3)
 pygame.draw.circle(bulletSprite, (255, 125, 0), (3, 3), 2)
+scaledBulletSprite = pygame.transform.scale(bulletSprite, (12, 12))
 
 # creating the various weapons
 weaponSprites = Sprites.LoadSpritesheet(pygame.image.load("playerWeaponSpriteSheet.png"), (16, 16))
@@ -1862,13 +3681,14 @@ player = Player(playerSprites, light)
 cameraPos = [600, 325]
 
 # loading amo sprites
-amoSprites = Sprites.LoadSpritesheet(pygame.image.load("amoSpriteSheet.png"), (6, 6))
+amoSprites = Sprites.LoadSpritesheet(pygame.image.load("AmoSpriteSheet.png"), (6, 6))
 amoSprites = Sprites.ScaleSprites(amoSprites, (18, 18))
 
 # part drops
 partDropSprites = Sprites.LoadSpritesheet(pygame.image.load("ShooterPartsSheet.png"), (8, 8))
 partDropSprites = Sprites.ScaleSprites(partDropSprites, (24, 24))
 partNames = ["Rusty Pipe", "Scrap Metal", "Rusty Nails", "Wire Spool", "Wood", "Gunpowder", "Metal Pipe", "Metal Sheet", "Nails", "Brass Casings", "Jerry Can", "Oil Can", "Spring", "blank", "blank", "blank", "blank", "Fire Powder"]
+partIndices = {name: i for i, name in enumerate(partNames) if name != "blank"}  # part name -> sprite index
 partDropSpritesDoubleScale = Sprites.ScaleSprites(partDropSprites, (48, 48))
 
 for name in partNames:  # a hack to start the player with a ton of items to test crafting
@@ -1925,293 +3745,332 @@ amoCrateDrops = [
 ]
 
 # UI elements
-dashText       = UI.TextRenderer(15, "pixel2.ttf", "DASH", (60, 20) , (225, 0, 0), centered=True)  #UI.DrawText(screen, 15, "pixel2.ttf", f"DASH", (60, 20), (225, 0, 0), centered=True)
+dashText       = HudText(15, "pixel2.ttf", "DASH", (60, 20) , (225, 0, 0), centered=True)  #UI.DrawText(screen, 15, "pixel2.ttf", f"DASH", (60, 20), (225, 0, 0), centered=True)
 
-weaponNameText = UI.TextRenderer(30, "pixel2.ttf", player.weaponInventory[player.weaponSlot].name, (10, 40) , (255, 0, 0))
-amoText        = UI.TextRenderer(30, "pixel2.ttf", f"{player.weaponInventory[player.weaponSlot].capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}", (10, 70) , (255, 0, 0))
-healthText     = UI.TextRenderer(30, "pixel2.ttf", f"{player.health}hp", (10, 100), (255, 0, 0))
+weaponNameText = HudText(30, "pixel2.ttf", player.weaponInventory[player.weaponSlot].name, (10, 40) , (255, 0, 0))
+amoText        = HudText(30, "pixel2.ttf", f"{player.weaponInventory[player.weaponSlot].capacityLeft} - {player.amoInventory[player.weaponInventory[player.weaponSlot].amoType]}", (10, 70) , (255, 0, 0))
+healthText     = HudText(30, "pixel2.ttf", f"{player.health}hp", (10, 100), (255, 0, 0))
+fpsText        = CachedText(15, "pixel2.ttf", (255, 0, 0))
+fpsRangeText   = CachedText(15, "pixel2.ttf", (255, 0, 0))
 
 # loading the first level
 tileMap=None
 solidObjects=None
 lights=None
+staticLightMap=None
+bulletSystem=None
+objectGrid=None
+mobGrid=None
+collisionGrid=None
+lineOfSight=None
+tileChunks=None
+flowField=None
+
+# the batched bullets and mobs (their copies of the map are loaded with the level)
+breakableTiles = [22, 29]  # barrels and amo crates
+if settings["performance"]["batchedBullets"]: bulletSystem = BulletSystem()
+mobBatch = None
+if settings["performance"]["batchedMobs"]: mobBatch = MobBatch(mobs)
+
 LoadLevel("ShooterL1")  # loads all the data from the save files for the level
 
 litAreas = []
 
 # creating an event manager
-events = Events.Manager()
+if HEADLESS:
+    benchmarkScript = defaultBenchmarkScript
+    if arguments.script: benchmarkScript = json.load(open(arguments.script))
+    events = ScriptedEvents(benchmarkScript)
+else: events = Events.Manager()
 
 # some time related things
 dt = 1/120
+if HEADLESS: dt = arguments.dt
 fps = 0
 desiredTime = 0  # 0 is unlimited, 1 / fps limits it to the fps desired
-lastCheckedFps = time.time()
+lastCheckedFps = GetTime()
+
+# the frame profiler (near free when it's disabled)
+profiler = FrameProfiler(DEV_MODE or HEADLESS or arguments.profile)
 
-setup = 0
-updating = 0
-gettingRenders = 0
-rendering = 0
-renderingSurfs = 0
-renderingUI = 0
-frame = 0
+# only redrawing the world and updating the parts of the window that changed
+dirtyRects = DirtyRects()
+if arguments.profile_out: atexit.register(profiler.Dump, arguments.profile_out)
 
 hitBoxesToRender = []
 lowest = 0
 heighest = 0
-lastReset = time.time()
+lastReset = GetTime()
 
 # =============================================================================
 #                               Main Game Loop
 #=============================================================================
 
 
-# running the game
-while True:
-    # the start of the frame
-    frameStart = time.time()
-    t1 = time.time()
-    
-    hitBoxesToRender = []  # dev stuff
-    
-    # getting the size of the screen (incase it got scaled or something)
-    oldScreenSize = screenSize
-    screenSize = screen.get_size()
-    litAreas = []
-
-    # updating the events
-    events.GetEvents()
-
-    # updating the zooming
-    zoom = max(min(zoom + events.scrollSpeed/50, 2.5), 0.5)
-    zoomedScreenSize = (screenSize[0]//zoom, screenSize[1]//zoom)
-    if events.scrollSpeed or screenSize != oldScreenSize:  # only updating it when necessary
-        # creating the cash surfaces
-        zoomDisplay = pygame.Surface(zoomedScreenSize)
-        lightMap = pygame.Surface(zoomedScreenSize)
-
-        zoomDisplay = zoomDisplay.convert()
-        lightMap = lightMap.convert()
+# running the game (only when it's run directly, so the tests can import it)
+if __name__ == "__main__":
+    while True:
+        # the start of the frame
+        frameStart = time.time()
+        profiler.Begin("frame")
+        profiler.Begin("setup")
     
-    # updaing the fps counter
-    if time.time() - lastCheckedFps > 0.1:
-        lastCheckedFps = time.time()
-        fps = round(1 / dt)
-
-    if time.time() - lastReset > 1:
-        lowest = fps
-        heighest = fps
-        lastReset = time.time()
-    lowest = min(lowest, fps)
-    heighest = max(heighest, fps)
-
-    t2 = time.time()
-    
-    # updating the player
-    player.Update(events, dt)
-
-    # updating the mobs
-    for enemy in mobs:
-        enemy.Update(events, dt)
-    
-    # spawing enimies randomly
-    if random.randint(0, round(25000*3 * dt)) == 0 and not len(mobs):
-        for i in range(random.randint(5, 9)):
-            mob = Enemy(zombieSprites, [random.randint(100, 1100), random.randint(100, 650)], 1, 35, random.randint(1, 5), zombieDrops, weapon=mobWeapons[["Pipe Pistol", "Pipe Shotty"][random.randint(0, 1)]].Copy())
-            mobs.append(mob)
-    
-    if ord("p") in events.events:  # a button to spawn zombies
-        for i in range(random.randint(5, 9)):
-            mob = Enemy(zombieSprites, [random.randint(100, 1100), random.randint(100, 650)], 1, 35, random.randint(1, 5), zombieDrops, weapon=mobWeapons[["Pipe Pistol", "Pipe Shotty"][random.randint(0, 1)]].Copy())
-            mobs.append(mob)
-
-    # updating the camera position
-    cameraPos = [Mix(cameraPos[0], player.position[0], dt * 5), Mix(cameraPos[1], player.position[1], dt * 5)]
-
-    t3 = time.time()  # t3, t1-5, t4
-
-    # drawing the base layer ground
-    pygame.draw.rect(lightMap, (0, 0, 0), [0, 0, zoomedScreenSize[0], zoomedScreenSize[1]])
-    pygame.draw.rect(zoomDisplay, (0, 0, 0), [0, 0, zoomedScreenSize[0], zoomedScreenSize[1]])
-
-    r1 = time.time()
-
-    # rendering all the lights
-    for light in lights:
-        light.Render(lightMap)
+        hitBoxesToRender = []  # dev stuff
     
-    r2 = time.time()
-
-    # the depth map to layer tiles and objects correctly (let's you walk behind objects and entities or infront)
-    depthMap = []
+        # getting the size of the screen (incase it got scaled or something)
+        oldScreenSize = screenSize
+        screenSize = screen.get_size()
+        litAreas = []
+
+        # updating the events
+        events.GetEvents()
+
+        # updating the zooming
+        zoom = max(min(zoom + events.scrollSpeed/50, 2.5), 0.5)
+        zoomedScreenSize = (screenSize[0]//zoom, screenSize[1]//zoom)
+        if events.scrollSpeed or screenSize != oldScreenSize:  # only updating it when necessary
+            # creating the cash surfaces
+            zoomDisplay = pygame.Surface(zoomedScreenSize)
+            lightMap = pygame.Surface(zoomedScreenSize)
+
+            zoomDisplay = zoomDisplay.convert()
+            lightMap = lightMap.convert()
+            if lightBuffer: lightBuffer.Resize(zoomedScreenSize)
+            surfacePool.Clear()  # the old sizes won't be asked for again
     
-    # rendering the solid objects
-    for obj in solidObjects:
-        depth = obj.pos[1]
-        depthMap.append([obj, depth, zoomDisplay])
+        # updaing the fps counter
+        if GetTime() - lastCheckedFps > 0.1:
+            lastCheckedFps = GetTime()
+            fps = round(1 / dt)
+
+        if GetTime() - lastReset > 1:
+            lowest = fps
+            heighest = fps
+            lastReset = GetTime()
+        lowest = min(lowest, fps)
+        heighest = max(heighest, fps)
+
+        # toggling the profiler overlay
+        if pygame.K_F3 in events.events: profiler.showOverlay = profiler.enabled and not profiler.showOverlay
+
+        profiler.End("setup")
+        profiler.Begin("updating")
     
-    r3 = time.time()
-
-    # rendering the player
-    player.RenderLighting(lightMap)
-    depth = player.position[1]
-    depthMap.append([player, depth, zoomDisplay, lightMap])
-
-    r4 = time.time()
-
-    # rendering the mobs
-    aliveEnemies = []
-    for enemy in mobs:
-        enemy.RenderLighting(lightMap)
-        depth = enemy.position[1]
-        depthMap.append([enemy, depth, zoomDisplay, lightMap])
-        if enemy.health > 0:
-            aliveEnemies.append(enemy)
-        else:  # killing the enemy
+        # updating the player
+        profiler.Begin("player.Update")
+        player.Update(events, dt)
+        profiler.End("player.Update")
+
+        # updating the bullets, sparks and dropped items
+        profiler.Begin("worldEntities.Update")
+        worldEntities.Update(events, dt)
+        profiler.End("worldEntities.Update")
+
+        # updating the mobs
+        profiler.Begin("mobs.Update")
+        flowField.Update([player.position[0] + player.hitBoxShift[0], player.position[1] + player.hitBoxShift[1]])
+        if mobBatch:
+            mobBatch.Update(events, dt)
+            deadEnemies = mobBatch.RemoveDead()
+        else:
+            lineOfSight.Update(mobs, player)
+            for enemy in mobs:
+                enemy.Update(events, dt)
+            deadEnemies = [enemy for enemy in mobs if enemy.health <= 0]
+            mobs = [enemy for enemy in mobs if enemy.health > 0]
+
+        # killing the mobs that died (dropping their loot and sparks)
+        for enemy in deadEnemies:
             enemy.Kill()
+            if not mobBatch: mobGrid.Remove(enemy)
 
             randomLife = random.uniform(4.75, 7.5)
             for i in range(random.randint(*enemy.sparkRange)):
                 x, y = random.randint(-100, 100), random.randint(-100, 100)
                 length = math.sqrt(x*x + y*y)
                 if not length: length = 1
-                spark = SparksParticle(enemy.position[::], [x/length * 100, y/length * 100], randomLife + random.uniform(-0.25, 0.25))
-                player.projectiles.append(spark)
-    mobs = aliveEnemies
-
-    r5 = time.time()
-
-    GetClippedArea()  # clipping the lit areas
-    #RenderGround(zoomDisplay)  # rendering the ground
-    for area in litAreas:
-        RenderGroundWindow(zoomDisplay, [area[0], area[1]], [area[2], area[3]])
-
-    r6 = time.time()
-
-    # drawing the rest of the ground
-    #depthMap += tileMap.RenderDepth(zoomDisplay, cameraPos, zoomedScreenSize, tileCenters)
-    for area in litAreas:
-        worldCoords = [area[0] - zoomedScreenSize[0]//2 + cameraPos[0] + area[2]//2, area[1] - zoomedScreenSize[1]//2 + cameraPos[1] + area[3]//2]
-        depthMap += tileMap.RenderDepth(zoomDisplay, worldCoords, [area[2], area[3]], tileCenters, screenOffset=[area[0], area[1]])
+                spark = AcquireParticle(SparksParticle, enemy.position[::], [x/length * 100, y/length * 100], randomLife + random.uniform(-0.25, 0.25))
+                worldEntities.Add(spark)
+        profiler.End("mobs.Update")
     
-    t4 = time.time()
-
-    # sorting and rendering the objects
-    ps1 = time.time()
-    sortedDepthMap = sorted(depthMap, key=lambda args: args[1])
-    ps2 = time.time()
-    for obj, depth, *args in sortedDepthMap:
-        obj.Render(*args)
+        # spawing enimies randomly
+        if random.randint(0, round(25000*3 * dt)) == 0 and not len(mobs):
+            for i in range(random.randint(5, 9)):
+                mob = Enemy(zombieSprites, [random.randint(100, 1100), random.randint(100, 650)], 1, 35, random.randint(1, 5), zombieDrops, weapon=mobWeapons[["Pipe Pistol", "Pipe Shotty"][random.randint(0, 1)]].Copy())
+                SpawnMob(mob)
     
-    t5 = time.time()
+        if ord("p") in events.events:  # a button to spawn zombies
+            for i in range(random.randint(5, 9)):
+                mob = Enemy(zombieSprites, [random.randint(100, 1100), random.randint(100, 650)], 1, 35, random.randint(1, 5), zombieDrops, weapon=mobWeapons[["Pipe Pistol", "Pipe Shotty"][random.randint(0, 1)]].Copy())
+                SpawnMob(mob)
+
+        # updating the camera position
+        cameraPos = [Mix(cameraPos[0], player.position[0], dt * 5), Mix(cameraPos[1], player.position[1], dt * 5)]
+
+        profiler.End("updating")
+        # skipping the whole world render when nothing in it changed since the last frame
+        redrawWorld = dirtyRects.CheckWorld(GetWorldSignature())
+        if redrawWorld:
+            profiler.Begin("getting renders")
+
+            # drawing the base layer ground
+            profiler.Begin("clearing")
+            if lightBuffer: lightBuffer.Clear()
+            else: pygame.draw.rect(lightMap, (0, 0, 0), [0, 0, zoomedScreenSize[0], zoomedScreenSize[1]])
+            pygame.draw.rect(zoomDisplay, (0, 0, 0), [0, 0, zoomedScreenSize[0], zoomedScreenSize[1]])
+            profiler.End("clearing")
+
+            # rendering all the fixed lights (the dynamic ones get added on top of them)
+            profiler.Begin("Light.Render")
+            lightTarget = lightBuffer or lightMap  # where the lights get rendered to
+            staticLightMap.Render(lightTarget)
+            profiler.End("Light.Render")
+
+            # the depth map to layer tiles and objects correctly (let's you walk behind objects and entities or infront)
+            depthMap = []
     
-    # rendering the light map
-    zoomDisplay.blit(lightMap, [0, 0], special_flags=pygame.BLEND_MULT)
-
-    # rendering hitboxes in dev mode
-    if DEV_MODE:
-        for box in hitBoxesToRender:
-            pygame.draw.rect(zoomDisplay, (255, 255, 255), [box[0]-cameraPos[0]+zoomedScreenSize[0]//2, box[1]-cameraPos[1]+zoomedScreenSize[1]//2, box[2], box[3]], width=2)
-
-        for box in litAreas:
-            pygame.draw.rect(zoomDisplay, (255, 0, 0), box, width=4)
+            # rendering the solid objects
+            for obj in solidObjects:
+                depth = obj.pos[1]
+                depthMap.append([obj, depth, zoomDisplay])
+
+            # rendering the player
+            profiler.Begin("entity lighting")
+            player.RenderLighting(lightTarget)
+            depth = player.position[1]
+            depthMap.append([player, depth, zoomDisplay, lightMap])
+
+            # rendering the mobs (only the batched mobs near the screen are brought up to date)
+            profiler.Begin("mobs.GetVisible")
+            visibleMobs = mobBatch.GetVisible(events, dt) if mobBatch else mobs
+            profiler.End("mobs.GetVisible")
+            for enemy in visibleMobs:
+                enemy.RenderLighting(lightTarget)
+                depth = enemy.position[1]
+                depthMap.append([enemy, depth, zoomDisplay, lightMap])
+            profiler.End("entity lighting")
+
+            profiler.Begin("GetClippedArea")
+            GetClippedArea()  # clipping the lit areas
+            profiler.End("GetClippedArea")
+
+            # rendering the ground and flat tiles from the chunk cache (the taller tiles get sorted with everything else)
+            profiler.Begin("tileChunks.Render")
+            #RenderGround(zoomDisplay)  # rendering the ground
+            depthMap += tileChunks.Render(zoomDisplay, litAreas)
+            profiler.End("tileChunks.Render")
     
-    screen.blit(pygame.transform.scale(zoomDisplay, screenSize), (0, 0))
-
-    t6 = time.time()
-
-    # rendering the dash cooldown
-    pygame.draw.rect(screen, (255, 255, 0), [8, 8, 104, 24])
-    pygame.draw.rect(screen, (225, 255, 225), [10, 10, 100, 20])
-    pygame.draw.rect(screen, (75, 75, 75), [10, 10, 100*(1 - min((time.time() - player.lastDashed) / player.stats["dashCooldown"], 1)), 20])
-    dashText.Render(screen)
+            profiler.End("getting renders")
+            profiler.Begin("rendering")
+
+            # sorting and rendering the objects
+            profiler.Begin("sorting")
+            sortedDepthMap = sorted(depthMap, key=lambda args: args[1])
+            profiler.End("sorting")
+            for obj, depth, *args in sortedDepthMap:
+                obj.Render(*args)
+    
+            profiler.End("rendering")
+            profiler.Begin("rendering surfs")
+    
+            # rendering the light map
+            if lightBuffer: lightBuffer.ApplyTo(zoomDisplay)
+            else: zoomDisplay.blit(lightMap, [0, 0], special_flags=pygame.BLEND_MULT)
 
-    # displaying the name of the held weapon
-    weaponNameText.Render(screen)
-    amoText.Render(screen)
-    healthText.Render(screen)
+            # rendering hitboxes in dev mode
+            if DEV_MODE:
+                for box in hitBoxesToRender:
+                    pygame.draw.rect(zoomDisplay, (255, 255, 255), [box[0]-cameraPos[0]+zoomedScreenSize[0]//2, box[1]-cameraPos[1]+zoomedScreenSize[1]//2, box[2], box[3]], width=2)
 
-    # rendering the player UI
-    player.RenderUI(screen)
+                for box in litAreas:
+                    pygame.draw.rect(zoomDisplay, (255, 0, 0), box, width=4)
+        
+            dirtyRects.SetBackground(zoomDisplay, screenSize)
+            profiler.End("rendering surfs")
+    
+        # working out which parts of the window are changing (only what the hud draws when the world and menus are the same)
+        if redrawWorld or player.openInventory or profiler.showOverlay: dirtyRects.MarkAll()
+        dirtyRects.RestoreBackground(screen)
+
+        profiler.Begin("rendering UI")
+        FlushTexts()  # re-rendering the hud text that changed this frame
+
+        # rendering the dash cooldown
+        dirtyRects.Add(pygame.draw.rect(screen, (255, 255, 0), [8, 8, 104, 24]))
+        pygame.draw.rect(screen, (225, 255, 225), [10, 10, 100, 20])
+        pygame.draw.rect(screen, (75, 75, 75), [10, 10, 100*(1 - min((GetTime() - player.lastDashed) / player.stats["dashCooldown"], 1)), 20])
+        dirtyRects.Add(dashText.Render(screen))
+
+        # displaying the name of the held weapon
+        dirtyRects.Add(weaponNameText.Render(screen))
+        dirtyRects.Add(amoText.Render(screen))
+        dirtyRects.Add(healthText.Render(screen))
+
+        # rendering the player UI
+        player.RenderUI(screen)
+
+        # rendering the fps counter
+        dirtyRects.Add(fpsText.Render(screen, f"FPS {fps}", (screenSize[0] - 90, 10)))
+        dirtyRects.Add(fpsRangeText.Render(screen, f"FPS {lowest} - {heighest}", (screenSize[0] - 120, 40)))
+    
+        profiler.End("rendering UI")
 
-    # rendering the fps counter
-    UI.DrawText(screen, 15, "pixel2.ttf", f"FPS {fps}", (screenSize[0] - 90, 10), (255, 0, 0))
-    UI.DrawText(screen, 15, "pixel2.ttf", f"FPS {lowest} - {heighest}", (screenSize[0] - 120, 40), (255, 0, 0))
+        # showing the profiler's stats
+        profiler.RenderOverlay(screen)
     
-    # updating the display
-    u1=time.time()
-    pygame.display.update()
-
-    if DEV_MODE:
-        t7 = time.time()
-
-        frame += 1
-
-        setup += t2-t1
-        updating += t3-t2
-        gettingRenders += t4-t3
-        rendering += t5-t4
-        renderingSurfs += t6-t5
-        renderingUI += t7-t6
-
-        print(f"Setup          : {setup/frame}sec | {1/(setup/frame)}fps")
-        print(f"Updating       : {updating/frame}sec | {1/(updating/frame)}fps")
-        print(f"Getting Renders: {gettingRenders/frame}sec | {1/(gettingRenders/frame)}fps")
-        print(f"Rendering      : {rendering/frame}sec | {1/(rendering/frame)}fps")
-        print(f"Rendering Surfs: {renderingSurfs/frame}sec | {1/(renderingSurfs/frame)}fps")
-        print(f"Rendering UI   : {renderingUI/frame}sec | {1/(renderingUI/frame)}fps")
-        print(f"Sorting        : {ps2-ps1}sec | {1/(ps2-ps1)}fps")
-
-        print(f"\nClearing       : {r1-t3 }sec | {1/(r1-t3  + 0.0000000001)}fps")
-        print( f"Lights         : {r2-r1 }sec | {1/(r2-r1  + 0.0000000001)}fps")
-        print(f"Objects        : {r3-r2 }sec | {1/(r3-r2  + 0.0000000001)}fps")
-        print(f"Player         : {r4-r3 }sec | {1/(r4-r3  + 0.0000000001)}fps")
-        print(f"Mobs           : {r5-r4 }sec | {1/(r5-r4  + 0.0000000001)}fps")
-        print(f"Ground         : {r6-r5 }sec | {1/(r6-r5  + 0.0000000001)}fps")
-        print(f"Tiles          : {t4 -r6}sec | {1/(t4 -r6 + 0.0000000001)}fps\n")
-        
-        print(f"Flip           : {t7 - u1}sec | {1/(t7 - u1)}fps\n")
-
-        print(f"FPS            : {1/((setup+updating+gettingRenders+rendering+renderingSurfs+renderingUI)/frame)}")
-        print("----------------------------------------------------")
-
-    """
-    0.00869565217 sec
-    = 115
-
-        Improved cashes (removed re-defining surfaces, and needless colorkey sets); a minimum of slight improvement across all fields with some have upwards of a 2.3x increase
-    Setup          : 0.00017508892107453162 sec | 5711.38364359628 fps
-    Updating       : 0.00024933454050010895 sec | 4010.6757691662983 fps
-    Getting Renders: 0.0009695519489121153 sec | 1031.404249274161 fps
-    Rendering      : 0.0011935437501347556 sec | 837.8410928691104 fps
-    Rendering Surfs: 0.002111574884746496 sec | 473.58017336906073 fps
-    Rendering UI   : 0.009136134370231376 sec | 109.4554829730109 fps
-
-    0.01383522841 sec
-    = 72.2792548388 fps (+7 fps from origonal)
-
-        Cashing light map; should be better, it didn't add any complexity and reduced creating surfaces
-    Setup          : 0.0002801260357240756sec | 3569.8216962060637fps
-    Getting Renders: 0.0010056728502466363sec | 994.359149453776fps
-
-        Cashing the zoom surface (+2x for setup)
-    Setup          : 0.0002018943800196529sec | 4953.0848748868475fps
-
-        Origonal
-    Setup          : 0.0004060645110456604  sec | 2462.6628843404487 fps
-    Updating       : 0.00030634021618992924 sec | 3264.3445004948535 fps
-    Getting Renders: 0.0009710687897804025  sec | 1029.7931624660082 fps
-    Rendering      : 0.002204267008889264   sec | 453.6655477613407  fps
-    Rendering Surfs: 0.0021211278946214134  sec | 471.4472911019275  fps
-    Rendering UI   : 0.009226923016899658   sec | 108.37849174296139 fps
-
-    0.01523579143 sec
-    = 65.6349231738 fps
-    """
-
-    # forcing the framerate to certain amounts
-    dif = max(desiredTime - (time.time() - frameStart), 0)
-    time.sleep(dif)
-    frameEnd = time.time()
-    dt = min(frameEnd - frameStart, 1/15)
+        # updating the display
+        profiler.Begin("flip")
+        dirtyRects.Flush()
+        profiler.End("flip")
+        profiler.End("frame")
+
+        """
+        0.00869565217 sec
+        = 115
+
+            Improved cashes (removed re-defining surfaces, and needless colorkey sets); a minimum of slight improvement across all fields with some have upwards of a 2.3x increase
+        Setup          : 0.00017508892107453162 sec | 5711.38364359628 fps
+        Updating       : 0.00024933454050010895 sec | 4010.6757691662983 fps
+        Getting Renders: 0.0009695519489121153 sec | 1031.404249274161 fps
+        Rendering      : 0.0011935437501347556 sec | 837.8410928691104 fps
+        Rendering Surfs: 0.002111574884746496 sec | 473.58017336906073 fps
+        Rendering UI   : 0.009136134370231376 sec | 109.4554829730109 fps
+
+        0.01383522841 sec
+        = 72.2792548388 fps (+7 fps from origonal)
+
+            Cashing light map; should be better, it didn't add any complexity and reduced creating surfaces
+        Setup          : 0.0002801260357240756sec | 3569.8216962060637fps
+        Getting Renders: 0.0010056728502466363sec | 994.359149453776fps
+
+            Cashing the zoom surface (+2x for setup)
+        Setup          : 0.0002018943800196529sec | 4953.0848748868475fps
+
+            Origonal
+        Setup          : 0.0004060645110456604  sec | 2462.6628843404487 fps
+        Updating       : 0.00030634021618992924 sec | 3264.3445004948535 fps
+        Getting Renders: 0.0009710687897804025  sec | 1029.7931624660082 fps
+        Rendering      : 0.002204267008889264   sec | 453.6655477613407  fps
+        Rendering Surfs: 0.0021211278946214134  sec | 471.4472911019275  fps
+        Rendering UI   : 0.009226923016899658   sec | 108.37849174296139 fps
+
+        0.01523579143 sec
+        = 65.6349231738 fps
+        """
+
+        # stepping the simulation by the fixed timestep when headless and stopping once the frame budget is used up
+        if HEADLESS:
+            simulatedTime += dt
+            simulatedFrames += 1
+            if simulatedFrames >= arguments.frames:
+                PrintBenchmark()
+                pygame.quit()
+                sys.exit()
+            continue
+
+        # forcing the framerate to certain amounts
+        dif = max(desiredTime - (time.time() - frameStart), 0)
+        time.sleep(dif)
+        frameEnd = time.time()
+        dt = min(frameEnd - frameStart, 1/15)
 
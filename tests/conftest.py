@@ -0,0 +1,6 @@
+import os, sys
+
+# importing the game (it runs headless with the dummy drivers when it's imported, and the main loop only runs when game.py is run directly)
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(root)  # the sprites and levels are loaded from the working directory
+sys.path.insert(0, root)
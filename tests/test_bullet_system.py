@@ -0,0 +1,65 @@
+import types
+
+import numpy
+import pytest
+
+import game
+
+
+# loads a small map into the bullet system (1 is a full wall and 22 is a barrel, which is hit anywhere in its tile)
+@pytest.fixture
+def bullets(monkeypatch):
+    rows = [
+        [0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 1, 0, 0],
+        [0, 0, 0, 0, 22, 0],
+    ]
+    monkeypatch.setattr(game, "tileMap", types.SimpleNamespace(map=rows, tileSize=64))
+    monkeypatch.setattr(game, "collisionGrid", [[game.tileHitBoxLookup[tile] for tile in row] for row in rows])
+    monkeypatch.setattr(game, "solidObjects", [])
+    monkeypatch.setattr(game, "objectGrid", game.SpatialGrid(64))
+    monkeypatch.setattr(game, "flowField", game.FlowField())
+    system = game.BulletSystem()
+    system.LoadMap()
+    return system
+
+
+def Hits(system: game.BulletSystem, segments: list) -> list:
+    starts = numpy.array([segment[0] for segment in segments], dtype=float)
+    deltas = numpy.array([segment[1] for segment in segments], dtype=float)
+    return system.SegmentTileHits(starts, deltas).tolist()
+
+
+def test_segment_tile_hits(bullets):
+    hits = Hits(bullets, [
+        [(10, 96), (300, 0)],  # into the wall
+        [(10, 32), (300, 0)],  # through the open row
+        [(10, 160), (300, 0)],  # into the barrel's tile
+        [(10, 96), (100, 0)],  # stopping short of the wall
+        [(224, 10), (0, 100)],  # down into the wall
+    ])
+    assert hits[0] == pytest.approx((192 - 10) / 300)
+    assert hits[1] == numpy.inf
+    assert hits[2] == pytest.approx((256 - 10) / 300)
+    assert hits[3] == numpy.inf
+    assert hits[4] == pytest.approx((64 - 10) / 100)
+
+
+def test_segment_tile_hits_match_the_scalar_raycast(bullets):
+    generator = numpy.random.default_rng(2)
+    starts = generator.uniform([0, 0], [384, 192], (200, 2))
+    deltas = generator.uniform(-150, 150, (200, 2))
+    hits = bullets.SegmentTileHits(starts, deltas)
+    for start, delta, hitTime in zip(starts.tolist(), deltas.tolist(), hits.tolist()):
+        hit = game.Raycast(start, [start[0] + delta[0], start[1] + delta[1]], game.breakableTiles)
+        assert hitTime == (pytest.approx(hit.fraction) if hit else numpy.inf)
+
+
+def test_segment_tile_hits_stop_at_collideable_objects(bullets):
+    obj = game.ShadowedObject([100, 0], [64, 64], [game.HitBox((0, 0), (20, 64))])
+    game.solidObjects.append(obj)
+    game.objectGrid.Insert(obj, obj.GetBox())
+    game.flowField.LoadObjects()  # (what ObjectsChanged does, without re-baking the lights)
+    bullets.LoadObjects()
+
+    assert Hits(bullets, [[(10, 32), (300, 0)]])[0] == pytest.approx((100 - 10) / 300)
@@ -0,0 +1,36 @@
+import pygame
+
+import game
+
+
+# one frame of the main loop's window update (the world is only re-rendered when its signature changes)
+def RunFrame(dirtyRects: game.DirtyRects, screen: pygame.Surface, openInventory: bool) -> None:
+    redrawWorld = dirtyRects.CheckWorld(("the same world",))
+    if redrawWorld: dirtyRects.SetBackground(pygame.Surface(screen.get_size()), screen.get_size())
+    if redrawWorld or openInventory: dirtyRects.MarkAll()
+    dirtyRects.RestoreBackground(screen)
+    if openInventory: game.player.inventoryPanel.Render(screen, game.player)
+    dirtyRects.Flush()
+
+
+def test_closing_the_inventory_updates_where_the_panel_was(monkeypatch):
+    updates = []
+    monkeypatch.setattr(pygame.display, "update", lambda rects=None: updates.append(rects))
+    screen = pygame.Surface(game.screenSize)
+    dirtyRects = game.DirtyRects()
+
+    RunFrame(dirtyRects, screen, False)
+    RunFrame(dirtyRects, screen, True)
+    panel = game.player.inventoryPanel.bounds
+    assert panel.w and panel.h
+
+    # the world isn't redrawn on the frame the inventory closes, but the panel still has to be cleared off the display
+    updates.clear()
+    RunFrame(dirtyRects, screen, False)
+    assert dirtyRects.worldSignature == ("the same world",)
+    rects = updates[-1]  # None is the whole window
+    assert rects is None or any(pygame.Rect(rect).contains(panel) for rect in rects)
+
+    # after that only the hud's own rects are sent again
+    RunFrame(dirtyRects, screen, False)
+    assert updates[-1] == []
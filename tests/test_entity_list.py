@@ -0,0 +1,53 @@
+import game
+
+
+class Entity:
+    def __init__(self, name: str, life: int=1) -> None:
+        self.name = name
+        self.life = life
+        self.resting = False
+        self.killed = False
+
+    def Update(self, events: object, dt: float) -> None:
+        self.life -= 1
+
+    def Kill(self) -> None:
+        self.killed = True
+
+
+def Names(entities: game.EntityList) -> list:
+    return [entity.name for entity in entities.items]
+
+
+def test_remove_swaps_the_last_entity_into_the_gap():
+    entities = game.EntityList()
+    for name in "abcd":
+        entities.Add(Entity(name))
+    assert entities.Remove(1).name == "b"
+    assert Names(entities) == ["a", "d", "c"]
+    assert entities.Remove(2).name == "c"  # removing the last one doesn't move anything
+    assert Names(entities) == ["a", "d"]
+
+
+def test_update_kills_the_dead_and_still_updates_the_swapped_in_entities():
+    entities = game.EntityList()
+    lives = {"a": 1, "b": 0, "c": 2, "d": 0, "e": 3}
+    everything = [Entity(name, life) for name, life in lives.items()]
+    for entity in everything:
+        entities.Add(entity)
+    entities.Update(None, 1/60, lambda entity: entity.life > 0)
+
+    assert sorted(Names(entities)) == ["c", "e"]
+    assert all(entity.life == lives[entity.name] - 1 for entity in everything)  # everything got exactly one update
+    assert [entity.name for entity in everything if entity.killed] == ["a", "b", "d"]
+
+
+def test_points_inside_a_collideable_objects_hitboxes_are_solid(monkeypatch):
+    monkeypatch.setattr(game, "objectGrid", game.SpatialGrid(64))
+    monkeypatch.setattr(game, "TileMapCollision", lambda position: False)  # (only the object is being checked)
+    obj = game.ShadowedObject([300, 300], [64, 64], [game.HitBox((0, 0), (20, 64))])
+    game.objectGrid.Insert(obj, obj.GetBox())
+
+    assert game.worldEntities.IsInsideSolid([310, 310])
+    assert not game.worldEntities.IsInsideSolid([340, 310])  # inside the object but past its hitbox
+    assert not game.worldEntities.IsInsideSolid([250, 310])
@@ -0,0 +1,65 @@
+import pytest
+
+import game
+
+
+# makes a flow field over a map drawn with # for walls and . for open tiles
+@pytest.fixture
+def MakeField(monkeypatch):
+    def Make(rows: list) -> game.FlowField:
+        wall = [game.HitBox((0, 0), (64, 64))]
+        monkeypatch.setattr(game, "collisionGrid", [[wall if tile == "#" else [] for tile in row] for row in rows])
+        monkeypatch.setattr(game, "solidObjects", [])
+        return game.FlowField()
+    return Make
+
+
+def test_rebuild_distances_in_the_open(MakeField):
+    field = MakeField([
+        ".....",
+        ".....",
+        ".....",
+    ])
+    field.targetCell = (2, 1)
+    field.Rebuild()
+    assert field.distances[(2, 1)] == 0
+    assert field.distances[(3, 1)] == 1
+    assert field.distances[(0, 1)] == 2
+    assert field.distances[(0, 0)] == pytest.approx(1 + 1.4142)
+    assert field.nextCells[(3, 1)] == (2, 1)
+    assert (2, 1) not in field.nextCells
+
+
+def test_rebuild_walks_around_walls_without_cutting_corners(MakeField):
+    field = MakeField([
+        "...",
+        ".#.",
+        "...",
+        "###",
+    ])
+    field.targetCell = (0, 1)
+    field.Rebuild()
+    # going around the wall (the diagonals past the wall's corners aren't allowed)
+    assert field.distances[(2, 1)] == 4
+    assert field.distances[(1, 0)] == 2  # the diagonal would clip the wall
+    assert field.distances[(0, 2)] == 1 and field.distances[(1, 2)] == 2
+    assert (1, 1) not in field.distances and (0, 3) not in field.distances
+
+
+def test_update_reuses_the_field_for_a_recent_target(MakeField):
+    field = MakeField([
+        ".....",
+        ".#...",
+        ".....",
+    ])
+    field.Update([32, 32])
+    first = field.distances
+    field.Update([32 + 64*3, 32])
+    field.Update([32, 32])
+    assert field.distances is first
+    assert (field.hits, field.misses) == (1, 2)
+
+    # changing the tiles throws the old fields away
+    field.Invalidate()
+    field.Update([32, 32])
+    assert field.distances is not first and field.distances == first
@@ -0,0 +1,36 @@
+import random
+
+import numpy
+import game
+
+
+# fills a mask with the pixels covered by a list of [x, y, width, height] areas (counting how many times each pixel is covered)
+def Coverage(areas: list, size: tuple) -> "numpy.ndarray":
+    mask = numpy.zeros((size[1], size[0]), dtype=int)
+    for x, y, width, height in areas:
+        mask[max(int(y), 0):max(int(y + height), 0), max(int(x), 0):max(int(x + width), 0)] += 1
+    return mask
+
+
+def test_clipped_areas_are_disjoint_and_cover_the_same_pixels():
+    size = (int(game.zoomedScreenSize[0]), int(game.zoomedScreenSize[1]))
+    generator = random.Random(1)
+    for trial in range(50):
+        # overlapping areas, some of them hanging off of the screen
+        areas = []
+        for i in range(generator.randint(0, 40)):
+            x, y = generator.randint(-100, size[0]), generator.randint(-100, size[1])
+            areas.append([x, y, generator.randint(1, 300), generator.randint(1, 300)])
+        game.litAreas = [area[:] for area in areas]
+        game.GetClippedArea()
+
+        expected = Coverage(areas, size) > 0
+        clipped = Coverage(game.litAreas, size)
+        assert clipped.max(initial=0) <= 1  # no pixel is covered twice
+        assert numpy.array_equal(clipped > 0, expected)
+
+
+def test_clipped_areas_merge_a_box_inside_another():
+    game.litAreas = [[10, 10, 100, 100], [20, 20, 10, 10]]
+    game.GetClippedArea()
+    assert game.litAreas == [[10, 10, 100, 100]]
@@ -0,0 +1,63 @@
+import types
+
+import pytest
+
+import game
+
+
+# an empty batch that new mobs are spawned into (the mobs list is shared with the batch like in the game)
+@pytest.fixture
+def batch(monkeypatch):
+    mobs = []
+    mobBatch = game.MobBatch(mobs, capacity=2)  # (small so adding the mobs grows the arrays)
+    monkeypatch.setattr(game, "mobs", mobs)
+    monkeypatch.setattr(game, "mobBatch", mobBatch)
+    monkeypatch.setattr(game, "player", types.SimpleNamespace(position=[0, 0]))
+    return mobBatch
+
+
+def SpawnMob(position: list) -> game.Enemy:
+    enemy = game.Enemy(game.zombieSprites, position, 1, 35, 3, game.zombieDrops, weapon=game.mobWeapons["Pipe Pistol"].Copy())
+    game.SpawnMob(enemy)
+    return enemy
+
+
+def test_remove_dead_keeps_the_rows_and_mobs_together(batch):
+    enemies = [SpawnMob([i * 100, 0]) for i in range(5)]
+    enemies[1].Hit(10, [0, 0])
+    enemies[4].Hit(10, [0, 0])
+    enemies[2].Hit(1, [5, 0])
+
+    dead = batch.RemoveDead()
+    assert {id(enemy) for enemy in dead} == {id(enemies[1]), id(enemies[4])}
+    assert dead[0].position == [400, 0] and dead[0].health <= 0
+
+    assert batch.count == len(game.mobs) == 3
+    assert {id(enemy) for enemy in game.mobs} == {id(enemies[0]), id(enemies[2]), id(enemies[3])}
+    for i, enemy in enumerate(game.mobs):
+        assert enemy.batchIndex == i
+        assert batch.positions[i].tolist() == [enemies.index(enemy) * 100, 0]
+    assert batch.healths[enemies[2].batchIndex] == 2
+    assert batch.velocities[enemies[2].batchIndex].tolist() == [5, 0]
+
+
+def test_only_cooled_down_mobs_in_range_fire(batch, monkeypatch):
+    monkeypatch.setattr(game, "worldEntities", types.SimpleNamespace(Extend=lambda projectiles: None))
+    monkeypatch.setattr(game, "lineOfSight", types.SimpleNamespace(Check=lambda start, end: True))
+    monkeypatch.setattr(game, "simulatedTime", 1000)  # (the clock is still at 0 when nothing has run)
+    now = game.GetTime()
+
+    ready = SpawnMob([50, 0])
+    coolingDown = SpawnMob([0, 50])
+    outOfRange = SpawnMob([500, 0])
+    for enemy in (ready, coolingDown, outOfRange):
+        batch.lastFired[enemy.batchIndex] = now - 100
+    batch.lastFired[coolingDown.batchIndex] = now
+
+    batch.UpdateWeapons(1)  # (a whole second so the random roll always passes)
+    assert batch.lastFired[ready.batchIndex] == ready.weapon.lastFired == now
+    assert batch.lastFired[coolingDown.batchIndex] == now and coolingDown.weapon.lastFired != now
+
+    # the mobs out of range get most of their cooldown back so they don't fire the instant they get close
+    fireRate = abs(outOfRange.weapon.fireRate)
+    assert batch.lastFired[outOfRange.batchIndex] == pytest.approx(now - max(fireRate - 0.25, 0.1))
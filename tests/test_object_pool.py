@@ -0,0 +1,46 @@
+import pygame
+
+import game
+
+
+class Thing:
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+
+def test_released_objects_are_reused_and_reinitialized():
+    pool = game.ObjectPool(Thing)
+    first = pool.Acquire(1)
+    pool.Release(first)
+    second = pool.Acquire(2)
+    assert second is first and second.value == 2
+    assert (pool.hits, pool.misses) == (1, 1)
+
+    # a new object is made once the free ones run out
+    third = pool.Acquire(3)
+    assert third is not first and (pool.hits, pool.misses) == (1, 2)
+
+
+def test_pool_only_holds_onto_max_free_objects():
+    pool = game.ObjectPool(Thing, maxFree=2)
+    for thing in [Thing(i) for i in range(5)]:
+        pool.Release(thing)
+    assert len(pool.freeObjects) == 2
+
+
+def test_particles_go_back_to_their_own_pool():
+    pool = game.particlePools[game.SparksParticle]
+    spark = game.AcquireParticle(game.SparksParticle, [0, 0], [1, 1], 1)
+    game.ReleaseParticle(spark)
+    assert pool.freeObjects[-1] is spark
+    assert game.AcquireParticle(game.SparksParticle, [5, 5], [0, 0], 1) is spark
+    assert spark.position == [5, 5]
+
+
+def test_surface_pool_clear_drops_the_old_sizes():
+    pool = game.SurfacePool(maxPerSize=1)
+    for size in [(8, 8), (8, 8), (16, 16)]:
+        pool.Release(pygame.Surface(size))
+    assert {key: len(surfaces) for key, surfaces in pool.freeSurfaces.items()} == {(8, 8, None): 1, (16, 16, None): 1}
+    pool.Clear()
+    assert pool.freeSurfaces == {}
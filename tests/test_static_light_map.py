@@ -0,0 +1,40 @@
+import pygame
+import pytest
+
+import game
+
+
+# copies of the level's lights with their shadows turned on (new objects so nothing baked is shared)
+def CopyLights() -> list:
+    return [game.Light(light.radius, light.color, light.step, True, light.pos) for light in game.lights]
+
+
+# the pixels of every baked chunk
+def Chunks(lightMap: game.StaticLightMap) -> dict:
+    return {chunk: pygame.image.tobytes(surface, "RGB") for chunk, surface in lightMap.chunks.items()}
+
+
+@pytest.fixture
+def level(monkeypatch):
+    monkeypatch.setattr(game, "solidObjects", list(game.solidObjects))
+    objectGrid = game.SpatialGrid(game.tileMap.tileSize)
+    for obj in game.solidObjects:
+        objectGrid.Insert(obj, obj.GetBox())
+    monkeypatch.setattr(game, "objectGrid", objectGrid)
+    lights = CopyLights()
+    monkeypatch.setattr(game, "lights", lights)
+    monkeypatch.setattr(game, "staticLightMap", game.StaticLightMap(lights))
+
+
+def test_adding_and_removing_an_object_matches_a_fresh_bake(level):
+    before = Chunks(game.staticLightMap)
+    light = game.lights[0]
+    obj = game.ShadowedObject([light.pos[0] + 40, light.pos[1] - 32], [64, 64], game.tileHitBoxLookup[1])
+
+    game.AddObject(obj)
+    added = Chunks(game.staticLightMap)
+    assert added != before  # the object casts a shadow
+    assert added == Chunks(game.StaticLightMap(CopyLights()))
+
+    game.RemoveObject(obj)
+    assert Chunks(game.staticLightMap) == before
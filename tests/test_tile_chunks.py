@@ -0,0 +1,37 @@
+import pygame
+import pytest
+
+import game
+
+
+# draws the map one tile at a time (the ground, then the flat tiles, then the taller tiles sorted by their depth)
+def RenderPerTile(screen: pygame.Surface) -> None:
+    game.RenderGround(screen)
+    tileSize = game.tileMap.tileSize
+    offset = [round(game.zoomedScreenSize[0]//2 - game.cameraPos[0]), round(game.zoomedScreenSize[1]//2 - game.cameraPos[1])]
+    tallTiles = []
+    for y, row in enumerate(game.tileMap.map):
+        for x, tile in enumerate(row):
+            if not tile: continue
+            position = [x*tileSize + offset[0], y*tileSize + offset[1]]
+            if game.tileCenters[tile] != -9999999: tallTiles.append((y*tileSize + game.tileCenters[tile], position, tile))
+            else: screen.blit(game.tiles[tile], position)
+    for depth, position, tile in sorted(tallTiles, key=lambda tallTile: tallTile[0]):
+        screen.blit(game.tiles[tile], position)
+
+
+# draws the map from the chunk cache the same way the main loop does
+def RenderChunks(screen: pygame.Surface) -> None:
+    depthMap = game.TileChunkCache().Render(screen, [[0, 0, screen.get_width(), screen.get_height()]])
+    for obj, depth, *args in sorted(depthMap, key=lambda args: args[1]):
+        obj.Render(*args)
+
+
+@pytest.mark.parametrize("cameraPos", [[640, 400], [951.25, 904.4], [1300, 600.75], [90.6, 1500.2]])
+def test_chunk_render_matches_the_per_tile_render(monkeypatch, cameraPos):
+    monkeypatch.setattr(game, "cameraPos", cameraPos)
+    size = [int(game.zoomedScreenSize[0]), int(game.zoomedScreenSize[1])]
+    perTile, chunked = pygame.Surface(size), pygame.Surface(size)
+    RenderPerTile(perTile)
+    RenderChunks(chunked)
+    assert pygame.image.tobytes(chunked, "RGB") == pygame.image.tobytes(perTile, "RGB")